@@ -0,0 +1,68 @@
+import os
+import hashlib
+import sqlite3
+import threading
+import time
+import logging
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("article_store")
+
+store_path = os.getenv("ARTICLE_STORE_PATH", ".cache/articles.sqlite")
+reuse_seconds = int(os.getenv("ARTICLE_REUSE_SECONDS", 24 * 3600))
+
+
+def content_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class ArticleStore:
+    """SQLite store of scraped articles keyed by link and content hash.
+
+    Successful extractions keep their text; failures are kept as typed rows
+    (``error_kind`` / ``error_message``) so they never leak into transcripts.
+    """
+
+    columns = (
+        "link", "url", "title", "source", "pub_date", "text", "content_hash",
+        "error_kind", "error_message", "fetch_seconds", "fetched_at",
+    )
+
+    def __init__(self, path=store_path):
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS articles ("
+            "link TEXT PRIMARY KEY, url TEXT, title TEXT, source TEXT, pub_date TEXT, "
+            "text TEXT, content_hash TEXT, error_kind TEXT, error_message TEXT, "
+            "fetch_seconds REAL, fetched_at REAL NOT NULL)"
+        )
+        self._db.commit()
+
+    def save(self, record):
+        record = dict(record, fetched_at=record.get("fetched_at") or time.time())
+        if record.get("text"):
+            record["content_hash"] = content_hash(record["text"])
+        values = [record.get(column) for column in self.columns]
+        with self._lock:
+            self._db.execute(
+                f"INSERT OR REPLACE INTO articles ({', '.join(self.columns)}) "
+                f"VALUES ({', '.join('?' for _ in self.columns)})",
+                values
+            )
+            self._db.commit()
+        return record
+
+    def get(self, link, max_age=reuse_seconds):
+        """Return a previously extracted article, or None if missing, stale or failed."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT * FROM articles WHERE link = ? AND error_kind IS NULL AND fetched_at >= ?",
+                (link, time.time() - max_age)
+            ).fetchone()
+        return dict(row) if row else None
@@ -0,0 +1,179 @@
+import os
+import json
+import shutil
+import hashlib
+import sqlite3
+import tempfile
+import threading
+import time
+import logging
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("artifact_store")
+
+store_root = os.getenv("ARTIFACT_STORE_ROOT", ".cache/artifacts")
+max_bytes = int(os.getenv("ARTIFACT_STORE_MAX_MB", 2048)) * 1024 * 1024
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def copy_atomic(src, dest):
+    """Copy next to ``dest`` and rename, so readers never see half a file.
+
+    Copies rather than hard links: stages rewrite their outputs in place, which
+    would otherwise corrupt the stored artifact through the shared inode.
+    """
+    fd, partial = tempfile.mkstemp(suffix=os.path.splitext(dest)[1], dir=os.path.dirname(dest) or ".")
+    os.close(fd)
+    try:
+        shutil.copyfile(src, partial)
+        os.replace(partial, dest)
+    finally:
+        if os.path.exists(partial):
+            os.remove(partial)
+
+
+class ArtifactStore:
+    """Content-addressed store of stage outputs with a size-bounded LRU.
+
+    Each artifact is keyed by a hash of the inputs that produced it, so a
+    retried job finds the script, audio, background or render it already paid
+    for. The ``journal`` table records which key each unfinished job's stages
+    produced, letting a restarted job resume without recomputing the inputs.
+    """
+
+    def __init__(self, root=store_root, max_size=max_bytes):
+        self.root = root
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(root, exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(root, "index.sqlite"), check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS artifacts ("
+            "key TEXT PRIMARY KEY, stage TEXT NOT NULL, path TEXT NOT NULL, "
+            "size INTEGER NOT NULL, created REAL NOT NULL, used REAL NOT NULL)"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS journal ("
+            "job TEXT NOT NULL, stage TEXT NOT NULL, key TEXT NOT NULL, at REAL NOT NULL, "
+            "PRIMARY KEY (job, stage))"
+        )
+        self._db.commit()
+
+    @staticmethod
+    def key(stage, *inputs):
+        payload = json.dumps([stage, *inputs], sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key, dest=None):
+        """Path of a stored artifact (copied to ``dest`` when given), or None on a miss."""
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT path FROM artifacts WHERE key = ?", (key,)).fetchone()
+            if row is None or not os.path.exists(row[0]):
+                self.misses += 1
+                return None
+            self._db.execute("UPDATE artifacts SET used = ? WHERE key = ?", (now, key))
+            self._db.commit()
+            self.hits += 1
+            if dest is None:
+                return row[0]
+            # Copied under the lock so eviction cannot remove the file mid-copy
+            copy_atomic(row[0], dest)
+        return dest
+
+    def put(self, key, src, stage):
+        """Store ``src`` under ``key`` and return the stored path."""
+        _, ext = os.path.splitext(src)
+        directory = os.path.join(self.root, key[:2])
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, key + ext)
+        now = time.time()
+        with self._lock:
+            copy_atomic(src, path)
+            self._db.execute(
+                "INSERT OR REPLACE INTO artifacts (key, stage, path, size, created, used) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, stage, path, os.path.getsize(path), now, now)
+            )
+            self._evict()
+            self._db.commit()
+        return path
+
+    def has(self, key):
+        with self._lock:
+            row = self._db.execute("SELECT path FROM artifacts WHERE key = ?", (key,)).fetchone()
+        return row is not None and os.path.exists(row[0])
+
+    def get_json(self, key):
+        path = self.get(key)
+        if path is None:
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def put_json(self, key, value, stage):
+        fd, partial = tempfile.mkstemp(suffix=".json")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(value, f, ensure_ascii=False)
+            self.put(key, partial, stage)
+        finally:
+            os.remove(partial)
+        return value
+
+    def _evict(self):
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM artifacts").fetchone()[0]
+        if total <= self.max_size:
+            return
+        for key, path, size in self._db.execute(
+            "SELECT key, path, size FROM artifacts ORDER BY used"
+        ).fetchall():
+            if total <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            self._db.execute("DELETE FROM artifacts WHERE key = ?", (key,))
+            total -= size
+            logger.info(f"🧹 Evicted artifact {key[:12]} ({size / 1_048_576:.1f} MiB)")
+
+    def record(self, job, stage, key):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO journal (job, stage, key, at) VALUES (?, ?, ?, ?)",
+                (job, stage, key, time.time())
+            )
+            self._db.commit()
+
+    def clear_journal(self, job):
+        with self._lock:
+            self._db.execute("DELETE FROM journal WHERE job = ?", (job,))
+            self._db.commit()
+
+    def journal(self, job, since=0):
+        """{stage: key} completed by an unfinished run of ``job`` at or after ``since``; older rows are dropped."""
+        with self._lock:
+            self._db.execute("DELETE FROM journal WHERE job = ? AND at < ?", (job, since))
+            self._db.commit()
+            rows = self._db.execute("SELECT stage, key FROM journal WHERE job = ?", (job,)).fetchall()
+        return dict(rows)
+
+    def stats(self):
+        with self._lock:
+            count, size = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM artifacts").fetchone()
+        return {"hits": self.hits, "misses": self.misses, "artifacts": count, "mib": round(size / 1_048_576, 1)}
+
+
+# Shared by every job, TTS segment and plate in the process, so one size bound covers them all
+artifacts = ArtifactStore()
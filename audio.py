@@ -1,88 +1,219 @@
+import os
+import re
+import json
+import shutil
+import hashlib
+import tempfile
+import threading
+import subprocess
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 from openai import OpenAI, OpenAIError
 from dotenv import load_dotenv
 from google.cloud import texttospeech
 from google.api_core.exceptions import GoogleAPIError
+from rate_limit import limits
+from artifact_store import artifacts
 import logging
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def make_audio(script, language, model):
-    load_dotenv()
-
-    def generate_speech(text: str, filename: str = "audio.mp3", voice: str = "coral", tone: str = "Speak in a cheerful and positive tone."):
-        speech_file_path = Path.cwd() / filename
-        try:
-            client = OpenAI()
-            with client.audio.speech.with_streaming_response.create(
-                model="tts-1-hd",
-                voice=voice,
-                input=text,
-                instructions=tone
-            ) as response:
-                response.stream_to_file(speech_file_path)
-
-            logger.info(f"✅ OpenAI speech saved to: {speech_file_path}")
-        except OpenAIError as e:
-            logger.error(f"⚠️ OpenAI TTS API error: {e}")
-        except Exception as e:
-            logger.error(f"⚠️ Unexpected error in generate_speech: {e}")
-
-    def synthesize_speech(text):
-        try:
-            client = texttospeech.TextToSpeechClient()
-
-            if language == 'Hindi':
-                voice = texttospeech.VoiceSelectionParams(
-                    language_code="hi-IN",
-                    name="hi-IN-Chirp3-HD-Autonoe"
-                )
-            elif language == 'English':
-                voice = texttospeech.VoiceSelectionParams(
-                    language_code="en-US",
-                    name="en-US-Chirp3-HD-Achird"
-                )
-            else:
-                logger.warning("Unsupported language. Must be 'English' or 'Hindi'.")
-                return
-
-            audio_config = texttospeech.AudioConfig(
-                audio_encoding=texttospeech.AudioEncoding.MP3,
-                speaking_rate=1.0,
-                pitch=0,
-                effects_profile_id=["telephony-class-application"]
-            )
-
-            synthesis_input = texttospeech.SynthesisInput(text=text)
-
-            response = client.synthesize_speech(
-                input=synthesis_input,
-                voice=voice,
-                audio_config=audio_config
-            )
-
-            output_filename = "audio.mp3"
-            with open(output_filename, "wb") as out:
-                out.write(response.audio_content)
-                logger.info(f"✅ Google speech saved to: {output_filename}")
-        except GoogleAPIError as e:
-            logger.error(f"⚠️ Google TTS API error: {e}")
-        except Exception as e:
-            logger.error(f"⚠️ Unexpected error in synthesize_speech: {e}")
+load_dotenv()
 
+max_workers = int(os.getenv("TTS_WORKERS", 4))
+
+google_voices = {
+    "Hindi": ("hi-IN", "hi-IN-Chirp3-HD-Autonoe"),
+    "English": ("en-US", "en-US-Chirp3-HD-Achird"),
+}
+google_audio = {
+    "speaking_rate": 1.0,
+    "pitch": 0,
+    "effects_profile_id": ["telephony-class-application"],
+}
+openai_model = "tts-1-hd"
+
+# Long-lived clients, created on first use and shared by every call
+_clients = {}
+_clients_lock = threading.Lock()
+
+_sentence_split = re.compile(r"(?<=[.!?।])\s+")
+# The intro and sign-off recur in every video; voicing them in one fixed tone
+# keeps them cache hits whatever the script's mood is
+recurring_tone = "Speak in a Professional and calm tone."
+_brand = re.compile(r"factline|फैक्टलाइन", re.IGNORECASE)
+
+
+def get_client(model):
+    with _clients_lock:
+        if model not in _clients:
+            _clients[model] = OpenAI() if model == "OpenAI" else texttospeech.TextToSpeechClient()
+        return _clients[model]
+
+
+def split_sentences(text):
+    return [s.strip() for s in _sentence_split.split(text.strip()) if s.strip()]
+
+
+def cache_key(text, voice, config):
+    payload = json.dumps({"text": text, "voice": voice, "config": config}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def generate_speech(text, filename, voice="coral", tone="Speak in a cheerful and positive tone."):
+    client = get_client("OpenAI")
+    with client.audio.speech.with_streaming_response.create(
+        model=openai_model,
+        voice=voice,
+        input=text,
+        instructions=tone
+    ) as response:
+        response.stream_to_file(filename)
+
+
+def synthesize_speech(text, filename, language):
+    client = get_client("GCloud")
+    language_code, name = google_voices[language]
+
+    response = client.synthesize_speech(
+        input=texttospeech.SynthesisInput(text=text),
+        voice=texttospeech.VoiceSelectionParams(language_code=language_code, name=name),
+        audio_config=texttospeech.AudioConfig(
+            audio_encoding=texttospeech.AudioEncoding.MP3,
+            **google_audio
+        )
+    )
+
+    with open(filename, "wb") as out:
+        out.write(response.audio_content)
+
+
+def voice_settings(script, language, model):
+    """Voice and config used both for synthesis and as part of the cache key."""
+    if model == "OpenAI":
+        voice = "onyx" if language == "English" else "coral"
+        return voice, {"model": openai_model, "tone": script.get('mood', 'Neutral tone.')}
+    return google_voices[language][1], dict(google_audio)
+
+
+def segment_configs(sentences, config):
+    """Per-sentence config: the intro, sign-off and brand lines drop the per-script tone."""
+    if "tone" not in config:
+        return [config] * len(sentences)
+    return [
+        dict(config, tone=recurring_tone) if index in (0, len(sentences) - 1) or _brand.search(sentence) else config
+        for index, sentence in enumerate(sentences)
+    ]
+
+
+def synthesize_segment(text, language, model, voice, config, dest):
+    """Write the MP3 for one sentence to ``dest``, from the artifact store or freshly synthesized."""
+    key = cache_key(text, voice, config)
+    if artifacts.get(key, dest):
+        return dest
+
+    if model == "OpenAI":
+        limits["openai_tts"].call(generate_speech, text, dest, voice=voice, tone=config["tone"])
+    else:
+        limits["google_tts"].call(synthesize_speech, text, dest, language)
+    artifacts.put(key, dest, "tts")
+    return dest
+
+
+def stream_openai_segment(text, voice, config, chunk_size, dest):
+    """Yield OpenAI TTS bytes as they arrive while also writing ``dest`` for the artifact store."""
+    with open(dest, "wb") as out:
+        client = get_client("OpenAI")
+        # Bytes already went downstream, so a streamed segment can wait for quota but not be retried
+        limits["openai_tts"].acquire()
+        with client.audio.speech.with_streaming_response.create(
+            model=openai_model,
+            voice=voice,
+            input=text,
+            instructions=config["tone"]
+        ) as response:
+            for chunk in response.iter_bytes(chunk_size):
+                out.write(chunk)
+                yield chunk
+    artifacts.put(cache_key(text, voice, config), dest, "tts")
+
+
+def stream_audio(script, language, model, chunk_size=32768):
+    """Yield the script's MP3 bytes in order while later sentences are still being synthesized.
+
+    The first uncached OpenAI sentence is streamed straight from the API; the
+    rest are synthesized concurrently and released as soon as their turn comes.
+    """
+    voice, config = voice_settings(script, language, model)
+    sentences = split_sentences(script['script'])
+    configs = segment_configs(sentences, config)
+    first_live = (
+        model == "OpenAI" and bool(sentences)
+        and not artifacts.has(cache_key(sentences[0], voice, configs[0]))
+    )
+
+    # Segments are copied out of the store, so eviction cannot pull one from under a reader
+    with tempfile.TemporaryDirectory(prefix="tts-") as workdir, ThreadPoolExecutor(max_workers=max_workers) as pool:
+        paths = [os.path.join(workdir, f"{index:03d}.mp3") for index in range(len(sentences))]
+        futures = [
+            None if index == 0 and first_live
+            else pool.submit(synthesize_segment, sentence, language, model, voice, configs[index], paths[index])
+            for index, sentence in enumerate(sentences)
+        ]
+        for index, sentence in enumerate(sentences):
+            if futures[index] is None:
+                yield from stream_openai_segment(sentence, voice, configs[index], chunk_size, paths[index])
+                continue
+            with open(futures[index].result(), "rb") as segment:
+                while chunk := segment.read(chunk_size):
+                    yield chunk
+
+
+def concat_segments(segments, output_file):
+    if len(segments) == 1:
+        shutil.copyfile(segments[0], output_file)
+        return
+
+    # ffmpeg's concat demuxer joins MP3 frames back to back without re-encoding
+    with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False, encoding="utf-8") as listing:
+        for segment in segments:
+            listing.write(f"file '{Path(segment).resolve()}'\n")
     try:
-        if model == "OpenAI":
-            generate_speech(
-                text=script['script'],
-                voice="onyx" if language == "English" else "coral",
-                tone=script.get('mood', 'Neutral tone.')
-            )
-        else:
-            synthesize_speech(text=script['script'])
-
-        return "audio.mp3"
+        subprocess.run(
+            ["ffmpeg", "-y", "-f", "concat", "-safe", "0", "-i", listing.name, "-c", "copy", output_file],
+            capture_output=True, check=True
+        )
+    finally:
+        os.remove(listing.name)
+
+
+def make_audio(script, language, model, output_file="audio.mp3"):
+    if model != "OpenAI" and language not in google_voices:
+        logger.warning("Unsupported language. Must be 'English' or 'Hindi'.")
+        return None
+
+    try:
+        voice, config = voice_settings(script, language, model)
+        sentences = split_sentences(script['script'])
+        configs = segment_configs(sentences, config)
+        cached = sum(1 for s, c in zip(sentences, configs) if artifacts.has(cache_key(s, voice, c)))
+
+        with tempfile.TemporaryDirectory(prefix="tts-") as workdir, ThreadPoolExecutor(max_workers=max_workers) as pool:
+            paths = [os.path.join(workdir, f"{index:03d}.mp3") for index in range(len(sentences))]
+            segments = list(pool.map(
+                lambda s, c, path: synthesize_segment(s, language, model, voice, c, path), sentences, configs, paths
+            ))
+            concat_segments(segments, output_file)
+        logger.info(f"✅ {model} speech saved to: {output_file} ({len(sentences)} segments, {cached} cached)")
+        return output_file
+    except OpenAIError as e:
+        logger.error(f"⚠️ OpenAI TTS API error: {e}")
+    except GoogleAPIError as e:
+        logger.error(f"⚠️ Google TTS API error: {e}")
+    except subprocess.CalledProcessError as e:
+        logger.error(f"⚠️ ffmpeg failed to join audio segments: {e.stderr}")
     except Exception as e:
         logger.error(f"⚠️ make_audio encountered an error but continuing: {e}")
-        return None
+    return None
@@ -0,0 +1,86 @@
+"""Render benchmark for the ffmpeg paths in video.py and waveform.py.
+
+Generates a synthetic voice-like tone, a background and a logo, renders them
+with every render profile and both waveform renderers (ffmpeg showwaves and
+NumPy), and reports encode seconds per output second, throughput in frames
+per second, output size and peak memory.
+
+Each case runs in a fresh process so peak RSS (Python plus its ffmpeg
+children) is measured per case.
+
+    python benchmark.py [--seconds 60] [--profiles fast-draft publish]
+"""
+import os
+import time
+import resource
+import argparse
+import tempfile
+import subprocess
+import multiprocessing
+from video import render_profiles
+
+
+def make_fixtures(workdir, seconds):
+    audio = os.path.join(workdir, "bench.mp3")
+    background = os.path.join(workdir, "bench_bg.png")
+    logo = os.path.join(workdir, "bench_logo.png")
+    # Amplitude-modulated tone so the waveform actually moves
+    subprocess.run(["ffmpeg", "-y", "-f", "lavfi", "-i", f"sine=frequency=220:duration={seconds}",
+                    "-af", "volume='0.5+0.5*sin(2*PI*t)':eval=frame", audio], capture_output=True, check=True)
+    subprocess.run(["ffmpeg", "-y", "-f", "lavfi", "-i", "testsrc2=s=768x1344", "-frames:v", "1", background],
+                   capture_output=True, check=True)
+    subprocess.run(["ffmpeg", "-y", "-f", "lavfi", "-i", "color=c=red:s=120x120", "-frames:v", "1", logo],
+                   capture_output=True, check=True)
+    return audio, background, logo
+
+
+def render_case(case, audio, background, logo, output, profile):
+    from video import create_music_visualizer, generate_fullwidth_waveform_video
+    from waveform import render_waveform_video
+
+    if case == "visualizer":
+        create_music_visualizer(audio, logo, background, output_video=output, profile=profile)
+    elif case == "waveform":
+        generate_fullwidth_waveform_video(audio, logo, output_file=output, profile=profile)
+    elif case == "numpy-visualizer":
+        render_waveform_video(audio, logo, output_file=output, background_image=background, profile=profile)
+    elif case == "numpy-waveform":
+        render_waveform_video(audio, logo, output_file=output, profile=profile)
+
+
+def measure(args):
+    started = time.perf_counter()
+    render_case(*args)
+    elapsed = time.perf_counter() - started
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return elapsed, own / 1024, children / 1024  # ru_maxrss is KiB on Linux
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=int, default=60)
+    parser.add_argument("--profiles", nargs="+", default=list(render_profiles))
+    parser.add_argument("--cases", nargs="+", default=["visualizer", "numpy-visualizer", "waveform", "numpy-waveform"])
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as workdir:
+        audio, background, logo = make_fixtures(workdir, args.seconds)
+        print(f"{'case':<34} {'encode':>9} {'per out s':>9} {'fps':>7} {'size':>10} {'py RSS':>10} {'ffmpeg RSS':>11}")
+        for profile in args.profiles:
+            frames = args.seconds * render_profiles[profile]["fps"]
+            for case in args.cases:
+                output = os.path.join(workdir, f"{case}-{profile}.mp4")
+                # Fresh process per case so ru_maxrss is not carried over
+                with context.Pool(1) as pool:
+                    elapsed, own, children = pool.apply(measure, ((case, audio, background, logo, output, profile),))
+                size = os.path.getsize(output) / 1_048_576 if os.path.exists(output) else 0
+                print(
+                    f"{case + '/' + profile:<34} {elapsed:8.2f}s {elapsed / args.seconds:9.3f} "
+                    f"{frames / elapsed:7.1f} {size:7.2f}MiB {own:7.1f}MiB {children:8.1f}MiB"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+import os
+import sqlite3
+import threading
+import time
+import logging
+from bs4 import BeautifulSoup
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("feed_poller")
+
+feeds_path = os.getenv("FEED_CACHE_PATH", ".cache/feeds.sqlite")
+# Cached bodies and seen items older than this are dropped
+retention_seconds = int(os.getenv("FEED_CACHE_RETENTION", 7 * 24 * 3600))
+
+
+def parse_items(body, limit=None):
+    soup = BeautifulSoup(body, 'xml')
+    return soup.find_all('item')[:limit]
+
+
+class FeedPoller:
+    """Conditional-GET RSS client that also tracks which items each topic has seen.
+
+    Validators (ETag / Last-Modified) and the last body are cached per URL,
+    so unchanged feeds cost a 304 and no parsing. Every item is recorded the
+    first time a topic sees it; a topic's score is how many items arrived
+    since it was last posted.
+    """
+
+    def __init__(self, fetch, path=feeds_path, retention=retention_seconds):
+        self._fetch = fetch
+        self.retention = retention
+        self._pruned = 0
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript(
+            "CREATE TABLE IF NOT EXISTS feeds ("
+            "url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, body TEXT, fetched REAL);"
+            "CREATE TABLE IF NOT EXISTS items ("
+            "topic TEXT, guid TEXT, title TEXT, first_seen REAL, PRIMARY KEY (topic, guid));"
+            "CREATE TABLE IF NOT EXISTS topics ("
+            "topic TEXT PRIMARY KEY, last_polled REAL, last_posted REAL);"
+        )
+        self._db.commit()
+        self.stats = {"fetched": 0, "not_modified": 0}
+
+    def fetch(self, url):
+        """Return (body, changed) for a feed, sending the cached validators."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT etag, last_modified, body FROM feeds WHERE url = ?", (url,)
+            ).fetchone()
+
+        validators = {}
+        if row and row[2]:
+            if row[0]:
+                validators["If-None-Match"] = row[0]
+            if row[1]:
+                validators["If-Modified-Since"] = row[1]
+
+        response = self._fetch(url, extra_headers=validators)
+        if response.status_code == 304 and row:
+            self.stats["not_modified"] += 1
+            with self._lock:
+                self._db.execute("UPDATE feeds SET fetched = ? WHERE url = ?", (time.time(), url))
+                self._db.commit()
+            return row[2], False
+
+        self.stats["fetched"] += 1
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO feeds (url, etag, last_modified, body, fetched) VALUES (?, ?, ?, ?, ?)",
+                (url, response.headers.get("ETag"), response.headers.get("Last-Modified"), response.text, time.time())
+            )
+            self._db.commit()
+        return response.text, True
+
+    def items(self, url, limit=5):
+        body, _ = self.fetch(url)
+        return parse_items(body, limit)
+
+    def prune(self, now=None):
+        """Drop bodies of feeds no longer polled and items too old to count as fresh."""
+        cutoff = (now or time.time()) - self.retention
+        with self._lock:
+            self._db.execute("DELETE FROM feeds WHERE fetched < ?", (cutoff,))
+            self._db.execute("DELETE FROM items WHERE first_seen < ?", (cutoff,))
+            self._db.commit()
+
+    def poll(self, topic, url):
+        """Fetch a topic's feed and record unseen items; returns the topic's score."""
+        body, changed = self.fetch(url)
+        now = time.time()
+        if now - self._pruned > 3600:
+            self.prune(now)
+            self._pruned = now
+        with self._lock:
+            if changed:
+                for item in parse_items(body):
+                    title = item.find('title')
+                    guid = item.find('guid') or item.find('link') or title
+                    if guid is None or not guid.text:
+                        continue
+                    self._db.execute(
+                        "INSERT OR IGNORE INTO items (topic, guid, title, first_seen) VALUES (?, ?, ?, ?)",
+                        (topic, guid.text, title.text if title else "", now)
+                    )
+            self._db.execute(
+                "INSERT INTO topics (topic, last_polled, last_posted) VALUES (?, ?, 0) "
+                "ON CONFLICT(topic) DO UPDATE SET last_polled = excluded.last_polled",
+                (topic, now)
+            )
+            self._db.commit()
+        return self.score(topic)
+
+    def last_polled(self, topic):
+        with self._lock:
+            row = self._db.execute("SELECT last_polled FROM topics WHERE topic = ?", (topic,)).fetchone()
+        return row[0] if row and row[0] else 0
+
+    def score(self, topic):
+        """Number of items first seen since the topic was last posted."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT COUNT(*) FROM items JOIN topics USING (topic) "
+                "WHERE topic = ? AND items.first_seen > topics.last_posted",
+                (topic,)
+            ).fetchone()
+        return row[0] if row else 0
+
+    def mark_posted(self, topic, when=None):
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO topics (topic, last_polled, last_posted) VALUES (?, 0, ?) "
+                "ON CONFLICT(topic) DO UPDATE SET last_posted = excluded.last_posted",
+                (topic, when or time.time())
+            )
+            self._db.commit()
+
+    def ranked(self, topics, min_new=1):
+        """Topics with at least ``min_new`` fresh items, freshest first."""
+        scored = [(self.score(topic), topic) for topic in topics]
+        return [topic for score, topic in sorted(scored, reverse=True) if score >= min_new]
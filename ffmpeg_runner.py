@@ -0,0 +1,194 @@
+import os
+import time
+import signal
+import resource
+import threading
+import subprocess
+import logging
+from collections import deque
+from tqdm import tqdm
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("ffmpeg_runner")
+
+wall_timeout = float(os.getenv("FFMPEG_TIMEOUT", 900))
+cpu_timeout = int(os.getenv("FFMPEG_CPU_TIMEOUT", 3600))
+stderr_lines = 40
+
+
+class FFmpegError(Exception):
+    """ffmpeg exited non-zero, was killed, or its input stream failed."""
+
+    def __init__(self, message, returncode=None, stderr_tail=""):
+        super().__init__(f"{message}\n{stderr_tail}" if stderr_tail else message)
+        self.returncode = returncode
+        self.stderr_tail = stderr_tail
+
+
+class FFmpegTimeout(FFmpegError):
+    pass
+
+
+def pump(sink, chunks, tee_path=None):
+    """Write an iterable of bytes into ``sink`` (ffmpeg's stdin) on a background thread.
+
+    The returned thread carries an ``error`` attribute, set when the source
+    itself failed, so callers can reject a render of truncated input.
+    """
+    def run():
+        tee = open(tee_path, "wb") if tee_path else None
+        try:
+            for chunk in chunks:
+                sink.write(chunk)
+                if tee:
+                    tee.write(chunk)
+        except BrokenPipeError:
+            logger.warning("⚠️ ffmpeg closed its input before the stream finished")
+        except Exception as e:
+            logger.error(f"❌ Input stream failed: {e}")
+            thread.error = e
+        finally:
+            if tee:
+                tee.close()
+            try:
+                sink.close()
+            except BrokenPipeError:
+                pass
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.error = None
+    thread.start()
+    return thread
+
+
+def _number(value):
+    try:
+        return float(value.rstrip("x"))
+    except (AttributeError, ValueError):
+        return 0.0  # Missing or "N/A"
+
+
+def parse_progress(lines):
+    """Group ffmpeg ``-progress`` key=value lines into one event per block."""
+    block = {}
+    for line in lines:
+        key, _, value = line.strip().partition("=")
+        if not key:
+            continue
+        block[key] = value
+        if key == "progress":
+            # out_time_ms is microseconds too, despite its name
+            out_time = block.get("out_time_us", block.get("out_time_ms"))
+            yield {
+                "frame": int(_number(block.get("frame"))),
+                "fps": _number(block.get("fps")),
+                "speed": _number(block.get("speed")),
+                "out_time": _number(out_time) / 1_000_000,
+                "progress": value,
+            }
+            block = {}
+
+
+def run_ffmpeg(cmd, duration=None, input_stream=None, tee_path=None, timeout=None, cpu_limit=None, label="ffmpeg"):
+    """Run an ffmpeg command with progress, wall/CPU timeouts and a bounded stderr tail.
+
+    ``duration`` may be a number or a callable that returns None until the
+    length is known (e.g. while streamed audio is still being teed). When
+    ``input_stream`` is given its bytes are fed to ffmpeg's stdin. Returns a
+    metrics dict; raises FFmpegError / FFmpegTimeout on failure.
+    """
+    timeout = wall_timeout if timeout is None else timeout
+    cpu_limit = cpu_timeout if cpu_limit is None else cpu_limit
+
+    if "-progress" not in cmd:
+        cmd = cmd[:-1] + ["-progress", "pipe:1", "-nostats", cmd[-1]]
+
+    tail = deque(maxlen=stderr_lines)
+    timed_out = threading.Event()
+    started = time.perf_counter()
+    last = {}
+
+    process = subprocess.Popen(
+        cmd,
+        stdin=subprocess.PIPE if input_stream is not None else subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+    # SIGXCPU terminates ffmpeg once it has burned cpu_limit seconds. Set after
+    # spawning: preexec_fn can deadlock the child when other threads exist, and
+    # the limit still counts the CPU time used before it was applied.
+    if hasattr(resource, "prlimit"):
+        try:
+            resource.prlimit(process.pid, resource.RLIMIT_CPU, (cpu_limit, cpu_limit + 5))
+        except (ProcessLookupError, PermissionError) as e:
+            logger.warning(f"{label}: could not set CPU limit: {e}")
+
+    def read_stderr():
+        for raw in process.stderr:
+            tail.append(raw.decode("utf-8", "replace").rstrip())
+
+    def kill():
+        timed_out.set()
+        process.kill()
+
+    stderr_thread = threading.Thread(target=read_stderr, daemon=True)
+    stderr_thread.start()
+    watchdog = threading.Timer(timeout, kill)
+    watchdog.daemon = True
+    watchdog.start()
+    feeder = pump(process.stdin, input_stream, tee_path=tee_path) if input_stream is not None else None
+
+    pbar = tqdm(total=None, unit="s", desc=label, position=0)
+    try:
+        lines = (raw.decode("utf-8", "replace") for raw in process.stdout)
+        for event in parse_progress(lines):
+            last = event
+            if pbar.total is None:
+                if not callable(duration):
+                    pbar.total = duration
+                elif feeder is None or not feeder.is_alive():
+                    pbar.total = duration()  # Streamed input is fully teed by now
+            pbar.n = min(event["out_time"], pbar.total) if pbar.total else event["out_time"]
+            pbar.set_postfix(fps=event["fps"], speed=f"{event['speed']}x", refresh=False)
+            pbar.refresh()
+
+        # wait4 reports this child's own CPU time, unaffected by other renders
+        _, status, usage = os.wait4(process.pid, 0)
+        process.returncode = os.waitstatus_to_exitcode(status)
+    finally:
+        watchdog.cancel()
+        pbar.close()
+        if process.returncode is None:
+            process.kill()
+            process.wait()
+        stderr_thread.join(timeout=5)
+        if feeder is not None:
+            feeder.join(timeout=5)
+        process.stdout.close()
+        process.stderr.close()
+
+    wall = time.perf_counter() - started
+    stderr_tail = "\n".join(tail)
+    if timed_out.is_set():
+        raise FFmpegTimeout(f"{label} exceeded {timeout:.0f}s wall clock", process.returncode, stderr_tail)
+    cpu_seconds = usage.ru_utime + usage.ru_stime
+    if process.returncode == -signal.SIGXCPU or (process.returncode != 0 and cpu_seconds >= cpu_limit):
+        raise FFmpegTimeout(f"{label} exceeded {cpu_limit}s CPU time", process.returncode, stderr_tail)
+    if process.returncode != 0:
+        raise FFmpegError(f"{label} failed with return code {process.returncode}", process.returncode, stderr_tail)
+    if feeder is not None and feeder.error:
+        raise FFmpegError(f"{label} input stream failed: {feeder.error}", process.returncode, stderr_tail)
+
+    out_time = last.get("out_time", 0.0)
+    metrics = {
+        "label": label,
+        "wall_seconds": round(wall, 2),
+        "cpu_seconds": round(cpu_seconds, 2),
+        "out_seconds": round(out_time, 2),
+        "frames": last.get("frame", 0),
+        "fps": round(last.get("frame", 0) / wall, 1) if wall else 0.0,
+        "realtime_factor": round(out_time / wall, 2) if wall else 0.0,
+    }
+    logger.info(f"📈 Render metrics: {metrics}")
+    return metrics
@@ -0,0 +1,88 @@
+import os
+import re
+import math
+import logging
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+import numpy as np
+from transcript import tfidf_matrix, tokenize
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("headlines")
+
+min_confidence = float(os.getenv("HEADLINE_MIN_CONFIDENCE", 0.15))
+half_life_hours = float(os.getenv("HEADLINE_HALF_LIFE_HOURS", 6))
+max_keywords = 6
+
+stopwords = set("""
+a an the and or but of in on at to for from by with as is are was were be been being has have had
+it its this that these those after before over under into about amid says say said will would can
+could may might new news latest live updates update watch video report reports here what why how
+who when where than then vs via up out off not no
+""".split())
+
+
+def clean_title(title):
+    # Google News titles end with " - Publisher"
+    return re.sub(r"\s+-\s+[^-]+$", "", title).strip()
+
+
+def recency(pub_date, now):
+    try:
+        age_hours = max((now - parsedate_to_datetime(pub_date)).total_seconds() / 3600, 0)
+    except (TypeError, ValueError):
+        return 0.5
+    return math.pow(0.5, age_hours / half_life_hours)
+
+
+def build_query(title, weights, vocab):
+    """Deterministic '+'-joined keywords: the highest TF-IDF terms, kept in headline order."""
+    words = [w for w in tokenize(clean_title(title)) if w not in stopwords and len(w) > 1]
+    unique = list(dict.fromkeys(words))
+    ranked = sorted(unique, key=lambda w: -weights[vocab[w]] if w in vocab else 0)[:max_keywords]
+    keep = [w for w in unique if w in ranked]
+    return "+".join(keep + ["news"])
+
+
+def select_headline(topic, items, recent_titles=()):
+    """Pick the headline to cover and turn it into an RSS query without an LLM.
+
+    ``items`` are dicts with ``title``, ``source`` and ``pub_date``. Each
+    headline is scored on relevance to the topic, agreement with the other
+    headlines (a story several outlets run is more important), recency,
+    novelty against ``recent_titles`` and source diversity. Returns
+    ``(query, confidence, title)``; confidence is the score margin between
+    the best and second-best headline.
+    """
+    if not items:
+        return None, 0.0, None
+
+    titles = [clean_title(item["title"]) for item in items]
+    topic_text = topic.replace("+", " ")
+    recent = [clean_title(t) for t in recent_titles]
+    matrix, vocab = tfidf_matrix(titles + [topic_text] + recent)
+    headlines = matrix[:len(titles)]
+    topic_vector = matrix[len(titles)]
+    recent_vectors = matrix[len(titles) + 1:]
+
+    similarity = headlines @ headlines.T
+    np.fill_diagonal(similarity, 0)
+    consensus = similarity.mean(axis=1) if len(titles) > 1 else np.zeros(len(titles))
+    relevance = headlines @ topic_vector
+    novelty = 1 - (headlines @ recent_vectors.T).max(axis=1) if len(recent) else np.ones(len(titles))
+
+    now = datetime.now(timezone.utc)
+    fresh = np.array([recency(item.get("pub_date"), now) for item in items])
+    sources = [item.get("source") or "Unknown" for item in items]
+    diversity = np.array([1 / sources.count(source) for source in sources])
+
+    scores = (0.35 * consensus + 0.25 * relevance + 0.2 * fresh + 0.1 * diversity) * novelty
+    order = np.argsort(-scores)
+    best = int(order[0])
+    runner_up = scores[order[1]] if len(order) > 1 else 0.0
+    confidence = float((scores[best] - runner_up) / scores[best]) if scores[best] > 0 else 0.0
+
+    query = build_query(items[best]["title"], headlines[best], vocab)
+    logger.info(f"🏷️ Local pick '{titles[best]}' → {query} (confidence {confidence:.2f})")
+    return query, confidence, items[best]["title"]
@@ -2,15 +2,46 @@
 
 import base64
 import os
+import re
+import time
+import sqlite3
+import tempfile
+import threading
+import logging
 import requests
+from concurrent.futures import ThreadPoolExecutor
+from rate_limit import limits
+from artifact_store import ArtifactStore
+from story_index import headline_terms
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("image")
+
 engine_id = "stable-diffusion-xl-1024-v1-0"
 api_host = os.getenv('API_HOST', 'https://api.stability.ai')
 api_key = os.getenv("STABILITY_AI_API")
+generation = {"cfg_scale": 7, "height": 1344, "width": 768, "samples": 1, "steps": 30}
+# Seconds to connect and to wait for the generated image
+connect_timeout = 10
+request_timeout = float(os.getenv("STABILITY_TIMEOUT", 90))
+# Jaccard similarity of prompt terms above which an existing image is reused; 1 disables the lookup
+background_similarity = float(os.getenv("BACKGROUND_SIMILARITY", 0.6))
+index_path = os.getenv("BACKGROUND_INDEX_PATH", ".cache/backgrounds.sqlite")
 
-def create_bg_img(prompt):
+def create_bg_img(prompt, output_file="background.png"):
     if api_key is None:
         raise Exception("Missing Stability API key.")
 
+    response = limits["stability"].call(request_image, prompt)
+    data = response.json()
+
+    with open(output_file, "wb") as f:
+        f.write(base64.b64decode(data["artifacts"][0]["base64"]))
+    
+    return output_file
+
+
+def request_image(prompt):
     response = requests.post(
         f"{api_host}/v1/generation/{engine_id}/text-to-image",
         headers={
@@ -24,20 +55,135 @@ def create_bg_img(prompt):
                     "text": prompt
                 }
             ],
-            "cfg_scale": 7,
-            "height": 1344,
-            "width": 768,
-            "samples": 1,
-            "steps": 30,
+            **generation,
         },
+        timeout=(connect_timeout, request_timeout),
     )
 
     if response.status_code != 200:
-        raise Exception("Non-200 response: " + str(response.text))
+        # HTTPError keeps the response, so the limiter can see 429s and Retry-After
+        raise requests.HTTPError("Non-200 response: " + str(response.text), response=response)
+    return response
 
-    data = response.json()
 
-    with open(f"background.png", "wb") as f:
-        f.write(base64.b64decode(data["artifacts"][0]["base64"]))
-    
-    return "background.png"
+def clean_prompt(prompt):
+    """Strip the '| Language #Shorts' suffix, hashtags and RSS '+' separators from a title or query."""
+    prompt = prompt.split("|")[0].replace("+", " ")
+    return re.sub(r"\s+", " ", re.sub(r"#\w+", "", prompt)).strip()
+
+
+def prompt_terms(prompt):
+    return headline_terms(clean_prompt(prompt))
+
+
+def normalize_prompt(prompt):
+    """Order- and case-insensitive form used as the cache key."""
+    return " ".join(sorted(prompt_terms(prompt))) or clean_prompt(prompt).lower()
+
+
+class BackgroundService:
+    """Generates backgrounds off the critical path and caches them by normalized prompt.
+
+    Images live in the shared artifact store; a small SQLite index maps each
+    normalized prompt to its key so that a closely matching title can reuse
+    an existing image instead of paying for a new one. ``prefetch`` starts
+    generation early and ``fetch`` joins an in-flight request for the same key.
+    """
+
+    def __init__(self, store, path=index_path, workers=2, min_similarity=background_similarity):
+        self.store = store
+        self.min_similarity = min_similarity
+        self.stats = {"generated": 0, "exact": 0, "similar": 0, "failed": 0}
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="background")
+        self._pending = {}
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS backgrounds ("
+            "key TEXT PRIMARY KEY, normalized TEXT NOT NULL, created REAL NOT NULL)"
+        )
+        self._db.commit()
+
+    def key(self, prompt):
+        return ArtifactStore.key("background", normalize_prompt(prompt), engine_id, generation)
+
+    def similar(self, prompt):
+        """Key of a stored image whose prompt terms overlap enough with ``prompt``, or None."""
+        terms = prompt_terms(prompt)
+        if not terms or self.min_similarity >= 1:
+            return None
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT key, normalized FROM backgrounds ORDER BY created DESC LIMIT 500"
+            ).fetchall()
+        best, best_score = None, self.min_similarity
+        for key, normalized in rows:
+            other = set(normalized.split())
+            score = len(terms & other) / len(terms | other) if other else 0
+            if score >= best_score and self.store.has(key):
+                best, best_score = key, score
+        return best
+
+    def _generate(self, prompt, key):
+        fd, partial = tempfile.mkstemp(suffix=".png")
+        os.close(fd)
+        try:
+            create_bg_img(clean_prompt(prompt), output_file=partial)
+            self.store.put(key, partial, "background")
+        finally:
+            os.remove(partial)
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO backgrounds (key, normalized, created) VALUES (?, ?, ?)",
+                (key, normalize_prompt(prompt), time.time())
+            )
+            self._db.commit()
+            self.stats["generated"] += 1
+        return key
+
+    def _resolve(self, prompt):
+        key = self.key(prompt)
+        if self.store.has(key):
+            self.stats["exact"] += 1
+            return key
+        match = self.similar(prompt)
+        if match:
+            self.stats["similar"] += 1
+            logger.info(f"🖼️ Reusing a background from a similar prompt for: {clean_prompt(prompt)}")
+            return match
+        return self._generate(prompt, key)
+
+    def prefetch(self, prompt):
+        """Start resolving ``prompt`` in the background; concurrent calls share one request."""
+        key = self.key(prompt)
+        with self._lock:
+            future = self._pending.get(key)
+            if future is not None:
+                return future
+            future = self._pool.submit(self._resolve, prompt)
+            self._pending[key] = future
+        # Outside the lock: the callback runs immediately if the future already finished
+        future.add_done_callback(lambda done: self._forget(key, done))
+        return future
+
+    def _forget(self, key, future):
+        with self._lock:
+            if self._pending.get(key) is future:
+                del self._pending[key]
+
+    def fetch(self, prompt, dest):
+        """Copy the background for ``prompt`` to ``dest`` and return the key it was stored under."""
+        try:
+            key = self.prefetch(prompt).result()
+        except Exception:
+            self.stats["failed"] += 1
+            raise
+        if self.store.get(key, dest) is None:
+            # Evicted between resolving and copying; generate it again
+            key = self._generate(prompt, self.key(prompt))
+            self.store.get(key, dest)
+        return key
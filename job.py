@@ -0,0 +1,141 @@
+import os
+import re
+import shutil
+import tempfile
+import datetime
+import logging
+from artifact_store import artifacts
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("job")
+
+workspace_root = os.getenv("JOB_WORKSPACE_ROOT") or None
+# Names from video.output_formats rendered per language; the first one is uploaded
+default_formats = os.getenv("RENDER_FORMATS", "short").split(",")
+
+
+class Job:
+    """Isolated scratch directory for one pipeline run.
+
+    Every stage writes to an explicit path inside the workspace, so several
+    post() runs can render side by side without clobbering each other's files.
+    The directory is removed when the ``with`` block ends unless ``keep`` is set.
+    Stage outputs are kept in the content-addressed ``store`` and journaled
+    under the job's name until ``complete()``. Stages always prefer the key
+    computed from their current inputs; a stage opted in with ``resume`` falls
+    back to the journaled output only while an earlier run is unfinished.
+    """
+
+    def __init__(self, name, root=workspace_root, keep=False, profile=None, formats=None, store=artifacts):
+        self.name = name
+        self.store = store
+        self.journal = {}  # {stage: key} completed by an earlier run of this job
+        self.keys = {}  # {stage: key} produced or reused by this run
+        self.profile = profile  # Render profile from video.render_profiles; None uses the default
+        self.formats = formats or default_formats
+        self.root = root
+        self.keep = keep
+        self.workdir = None
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def open(self):
+        slug = re.sub(r"[^A-Za-z0-9]+", "-", self.name).strip("-")[:40] or "job"
+        if self.root:
+            os.makedirs(self.root, exist_ok=True)
+        self.workdir = tempfile.mkdtemp(prefix=f"{slug}-", dir=self.root)
+        logger.info(f"📁 Job workspace: {self.workdir}")
+        # Only today's journal counts: scripts announce the date, so an older run cannot be resumed
+        today = datetime.datetime.combine(datetime.date.today(), datetime.time.min).timestamp()
+        self.journal = self.store.journal(self.name, since=today)
+        if self.journal:
+            logger.info(f"♻️ Resuming job with completed stages: {sorted(self.journal)}")
+        return self
+
+    def close(self):
+        if self.keep:
+            logger.info(f"📁 Keeping job workspace: {self.workdir}")
+        else:
+            shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def path(self, filename):
+        return os.path.join(self.workdir, filename)
+
+    @property
+    def background(self):
+        # Shared by every language of the same topic
+        return self.path("background.png")
+
+    def audio(self, language):
+        return self.path(f"audio-{language.lower()}.mp3")
+
+    def output(self, language):
+        return self.path(f"output-{language.lower()}.mp4")
+
+    def outputs(self, language, formats):
+        """Output specs for every requested rendition; the first keeps the primary path."""
+        specs = []
+        for index, name in enumerate(self.formats):
+            path = self.output(language) if index == 0 else self.path(f"output-{language.lower()}-{name}.mp4")
+            specs.append(dict(formats[name], path=path))
+        return specs
+
+    def resolve(self, stage, key, resume=False):
+        """Key to use for ``stage``: ``key`` if stored, else with ``resume`` the one an unfinished run journaled."""
+        if resume and not self.store.has(key):
+            journaled = self.journal.get(stage)
+            if journaled and self.store.has(journaled):
+                return journaled
+        return key
+
+    def reuse(self, stage, key, dest, resume=False):
+        """Copy the stored artifact to ``dest``; returns ``dest`` on a hit, None on a miss."""
+        key = self.resolve(stage, key, resume)
+        if self.store.get(key, dest) is None:
+            return None
+        logger.info(f"♻️ {stage}: reusing artifact {key[:12]}")
+        self.done(stage, key)
+        return dest
+
+    def save(self, stage, key, path):
+        self.store.put(key, path, stage)
+        self.done(stage, key)
+        return path
+
+    def done(self, stage, key):
+        self.keys[stage] = key
+        self.store.record(self.name, stage, key)
+
+    def complete(self):
+        """Forget the journal once every stage succeeded, so the next run under this name starts fresh."""
+        self.store.clear_journal(self.name)
+        self.journal = {}
+
+    def cached(self, stage, key, dest, produce, resume=False):
+        """Reuse the artifact for ``stage`` or run ``produce()`` (which writes ``dest``) and store it."""
+        if self.reuse(stage, key, dest, resume):
+            return dest
+        path = produce()
+        if path:
+            self.save(stage, key, path)
+        return path
+
+    def cached_json(self, stage, key, produce, resume=False):
+        """Same as ``cached`` for JSON-serialisable results; None results are not stored."""
+        key = self.resolve(stage, key, resume)
+        value = self.store.get_json(key)
+        if value is not None:
+            logger.info(f"♻️ {stage}: reusing artifact {key[:12]}")
+            self.done(stage, key)
+            return value
+        value = produce()
+        if value is not None:
+            self.store.put_json(key, value, stage)
+            self.done(stage, key)
+        return value
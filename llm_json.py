@@ -0,0 +1,123 @@
+import re
+import json
+import threading
+import logging
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("llm_json")
+
+_fence = re.compile(r"```(?:json)?\s*(.*?)(?:```|$)", re.DOTALL | re.IGNORECASE)
+_trailing_comma = re.compile(r",\s*([}\]])")
+
+# Process-wide counters so retry cost shows up in the logs
+stats = {"parsed": 0, "repaired": 0, "reasks": 0, "failed": 0}
+_stats_lock = threading.Lock()
+
+
+def _count(key):
+    with _stats_lock:
+        stats[key] += 1
+
+
+def strip_fences(text):
+    text = text.strip()
+    match = _fence.search(text)
+    return match.group(1).strip() if match else text
+
+
+def repair_json(text):
+    """Best-effort fix for almost-valid JSON from an LLM.
+
+    Drops text around the outermost object, escapes quotes and newlines that
+    appear inside string values, removes trailing commas and closes any
+    strings, arrays or objects left open by a truncated response.
+    """
+    text = strip_fences(text)
+    start = text.find("{")
+    if start == -1:
+        return text
+    text = text[start:]
+
+    out = []
+    stack = []
+    in_string = False
+    escaped = False
+    for index, char in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == "\n":
+                out.append("\\n")
+                continue
+            elif char == '"':
+                # A quote only ends the string if structure follows it
+                rest = text[index + 1:].lstrip()
+                if rest and rest[0] not in ",:}]":
+                    out.append('\\"')
+                    continue
+                in_string = False
+            out.append(char)
+            continue
+
+        if char == '"':
+            in_string = True
+        elif char in "{[":
+            stack.append("}" if char == "{" else "]")
+        elif char in "}]":
+            if not stack:
+                break
+            stack.pop()
+            out.append(char)
+            if not stack:
+                break  # Anything after the outermost object is trailing text
+            continue
+        out.append(char)
+
+    if in_string:
+        out.append('"')
+    out.extend(reversed(stack))
+    return _trailing_comma.sub(r"\1", "".join(out))
+
+
+def parse_llm_json(content):
+    """Parse an LLM reply, falling back to a local repair pass before giving up."""
+    try:
+        data = json.loads(strip_fences(content))
+        _count("parsed")
+        return data
+    except json.JSONDecodeError:
+        pass
+
+    data = json.loads(repair_json(content))
+    _count("repaired")
+    logger.info("🩹 Repaired malformed JSON from LLM locally.")
+    return data
+
+
+def reask_messages(content, error, schema_hint):
+    """Short follow-up prompt that asks only for corrected JSON, without the transcript."""
+    _count("reasks")
+    return [
+        ("system", "You fix malformed JSON. Output only valid JSON and nothing else."),
+        ("user", (
+            f"This JSON is invalid ({error}). Return it corrected, keeping all content, "
+            f"with this structure: {schema_hint}\n\n{content}"
+        )),
+    ]
+
+
+def failed_generation(error):
+    """The reply Groq rejected with ``json_validate_failed``, or None for any other error."""
+    body = getattr(error, "body", None)
+    if isinstance(body, dict) and isinstance(body.get("error"), dict):
+        body = body["error"]
+    if not isinstance(body, dict) or body.get("code") != "json_validate_failed":
+        return None
+    return body.get("failed_generation") or ""
+
+
+def record_failure():
+    _count("failed")
@@ -1,35 +1,31 @@
 import requests
-from bs4 import BeautifulSoup
 from langchain_groq import ChatGroq
 from langchain_core.prompts import ChatPromptTemplate
 import time
+import threading
+from collections import deque
 from dotenv import load_dotenv
 import os
-from post import post
+from post import scripts, produce, backgrounds
+from scrape import scrape_save, feed_poller
+from job import Job, artifacts
+from scheduler import Stage, Pipeline
+from headlines import select_headline as rank_headlines, min_confidence
+from story_index import StoryIndex, headline_terms
+from transcript import estimate_tokens
+from rate_limit import limits
 import logging
 
 # Setup
 load_dotenv()
 os.environ["GROQ_API_KEY"] = os.getenv("GROQ_API_KEY")
 model = "GCloud"
+languages = ["English", "Hindi"]
 
 # Logging config
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-headers = {
-    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:125.0) Gecko/20100101 Firefox/125.0",
-    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8",
-    "Accept-Language": "en-US,en;q=0.9",
-    "Referer": "https://www.google.com/",
-    "DNT": "1",
-    "Connection": "keep-alive",
-    "Upgrade-Insecure-Requests": "1",
-    "Sec-Fetch-Dest": "document",
-    "Sec-Fetch-Mode": "navigate",
-    "Sec-Fetch-Site": "cross-site",
-}
-
 # LLM setup
 llm = ChatGroq(model="llama-3.1-8b-instant", temperature=0)
 prompt = ChatPromptTemplate.from_messages([
@@ -66,40 +62,192 @@ prompt = ChatPromptTemplate.from_messages([
 chain = prompt | llm
 topics = ["india","india+politics", "global", "sports", "economic", "entertainment"]
 
+# Freshness scheduling: a topic is posted once enough new items arrived since its last post
+min_new_items = int(os.getenv("TOPIC_MIN_NEW_ITEMS", 3))
+poll_interval = int(os.getenv("FEED_POLL_INTERVAL", 300))
+# Floor between two posts of the same topic, however busy its feed is
+topic_interval = int(os.getenv("TOPIC_MIN_INTERVAL", 1800))
+
+
+def topic_url(topic):
+    return f"https://news.google.com/rss/search?q=latest+{topic}+news"
+
+
+def fetch_feed(work):
+    topic = work["topic"]
+    logger.info(f"🔍 Fetching news for topic: {topic}")
+    # Served from the poller's cache when the feed answers 304
+    listnews = feed_poller.items(topic_url(topic))
+    work["headlines"] = [
+        {
+            "title": i.find('title').text,
+            "source": i.find('source').text if i.find('source') else "Unknown",
+            "pub_date": i.find('pubDate').text if i.find('pubDate') else None,
+        }
+        for i in listnews
+    ]
+    return work if work["headlines"] else None
+
+
+# Headlines picked recently, so the local ranker prefers stories not yet covered
+recent_titles = deque(maxlen=50)
+# Stories already turned into videos, across topics and restarts
+story_index = StoryIndex()
+
+
+def article_text(work):
+    return "\n".join(article["Content"] for article in work["articles"] if article.get("Content"))
+
+
+def already_covered(work):
+    # Checked before any expensive stage runs; the same story often returns under several topics
+    match = story_index.covered_headline(work["title"]) if work.get("title") else None
+    if match is None and work.get("articles"):
+        match = story_index.covered_text(article_text(work))
+    if match:
+        logger.info(f"⏭️ Skipping '{work['topic']}': already covered as '{match[2]}' ({match[0]})")
+        work["covered"] = True
+    return match is not None
+
+
+def select_headline(work):
+    # Drop covered stories up front, so the next candidate is used instead of skipping the topic
+    headlines = [item for item in work["headlines"] if not story_index.covered_headline(item["title"])]
+    if len(headlines) < len(work["headlines"]):
+        logger.info(f"⏭️ Ignoring {len(work['headlines']) - len(headlines)} already covered headlines for '{work['topic']}'")
+    if not headlines:
+        work["covered"] = True
+        return None
+    titles = [item["title"] for item in headlines]
+    logger.info(f"Processing headlines: {titles}")
+
+    # Rank locally first; the LLM only breaks ties the ranker is unsure about
+    query, confidence, title = rank_headlines(work["topic"], headlines, recent_titles)
+    work["title"] = title
+    if query and confidence >= min_confidence:
+        work["query"] = query
+        recent_titles.append(title)
+        return prefetch_background(work, title)
+
+    logger.info(f"Local headline confidence {confidence:.2f} below {min_confidence}; asking the LLM.")
+    result = limits["groq-instant"].call(chain.invoke, {"topic": work["topic"], "input": str(titles)},
+                                         tokens=estimate_tokens(str(titles)) + 100)
+
+    if not result or not result.content:
+        logger.warning("LLM returned empty content.")
+        return None
+    work["query"] = result.content.strip()
+    # The LLM's pick is only known through its query, which is what gets indexed once covered
+    work["title"] = None
+    if title and query_from_title(work["query"], title):
+        recent_titles.append(title)
+    # The LLM may have picked another headline than the local ranker, so its query is the prompt
+    return prefetch_background(work, work["query"])
+
+
+def query_from_title(query, title):
+    # Most of the LLM's keywords appear in the headline when it agreed with the local pick
+    terms = headline_terms(query)
+    return bool(terms) and len(terms & headline_terms(title)) >= len(terms) / 2
+
+
+def prefetch_background(work, prompt):
+    # Start the image now so it is ready long before the render needs it
+    if "English" in languages:
+        work["background_prompt"] = prompt
+        backgrounds.prefetch(prompt)
+    return work
+
+
+def scrape(work):
+    # One workspace per story; languages share its background image, and a
+    # restart of the same story resumes from its journal
+    work["job"] = Job(f"{work['topic']}-{work['query']}").open()
+    # Scrape once and share the bundle with every language
+    work["articles"] = scrape_save(work["query"])
+    if not work["articles"]:
+        logger.warning(f"No articles scraped for query: {work['query']}")
+        return None
+    if already_covered(work):
+        return None
+    return work
+
+
+def script(work):
+    # One LLM call scripts every language at once
+    work["data"] = scripts(work["query"], languages, work["articles"], work["job"])
+    return work if work["data"] else None
+
+
+def media(work):
+    # The same dependency graph post() runs: TTS and the background overlap,
+    # renders share post.render_slots, and each upload overlaps the next language
+    work["videos"] = produce(work["data"], languages, model, work["job"], background_prompt=work.get("background_prompt"))
+    if not any(work["videos"].values()):
+        return None
+    story_index.add(work["topic"], work.get("title") or work["query"], article_text(work))
+    logger.info(f"Cycle complete for topic '{work['topic']}': {work['query']}")
+    return work
+
+
+in_flight = set()
+in_flight_lock = threading.Lock()
+
+
+def finish(work, ok):
+    if work.get("job"):
+        # A partly failed story keeps its journal so the retry skips what succeeded
+        if ok and all(work["videos"].values()):
+            work["job"].complete()
+        work["job"].close()
+    # A duplicate story consumed the topic's fresh items just like a post would;
+    # otherwise its score stays high and the same duplicate is re-queued
+    if ok or work.get("covered"):
+        feed_poller.mark_posted(work["topic"], when=work["started"])
+    with in_flight_lock:
+        in_flight.discard(work["topic"])
+    if not ok:
+        logger.warning(f"Topic '{work['topic']}' left the pipeline early.")
+
+
+# Workers and pacing per stage; pacing follows each provider's quota rather than fixed sleeps
+pipeline = Pipeline([
+    Stage("feed", fetch_feed, workers=2, min_interval=1),
+    Stage("headline", select_headline, workers=1),
+    Stage("scrape", scrape, workers=2),
+    Stage("script", script, workers=1),
+    # Renders inside are bounded by post.render_slots, so two stories can overlap TTS and uploads
+    Stage("media", media, workers=2),
+], on_finish=finish).start()
+
+last_started = {}
 while True:
+    # Conditional GETs are cheap: unchanged feeds answer 304 and are not re-parsed
     for topic in topics:
         try:
-            logger.info(f"🔍 Fetching news for topic: {topic}")
-            url = f"https://news.google.com/rss/search?q=latest+{topic}+news"
-            response = requests.get(url, headers=headers, timeout=10)
-            response.raise_for_status()
-
-            soup = BeautifulSoup(response.text, 'xml')
-            listnews = soup.find_all('item')[:5]
-            impdata = [i.find('title').text for i in listnews]
-
-            logger.info(f"Processing headlines: {impdata}")
-            result = chain.invoke({"topic": topic, "input": str(impdata)})
-
-            if not result or not result.content:
-                logger.warning("LLM returned empty content.")
-                continue
-
-            logger.info("Posting English audio...")
-            post(result.content, "English", model=model)
-            logger.info("English Done")
-
-            time.sleep(10)
-
-            logger.info("Posting Hindi audio...")
-            post(result.content, "Hindi", model=model)
-            logger.info("Hindi Done")
-
-            logger.info(f"Cycle complete for topic '{topic}': {result.content}")
+            if time.time() - feed_poller.last_polled(topic) >= poll_interval:
+                feed_poller.poll(topic, topic_url(topic))
         except requests.RequestException as e:
-            logger.error(f"Network error for topic '{topic}': {e}")
+            logger.error(f"Network error polling topic '{topic}': {e}")
         except Exception as e:
-            logger.error(f"Unexpected error for topic '{topic}': {e}")
-
-        logger.info("Sleeping for 1 hour before next news cycle...\n")
-        time.sleep(5400)
+            # A malformed feed or cache error must not stop the scheduler loop
+            logger.exception(f"Error polling topic '{topic}': {e}")
+
+    try:
+        ready = feed_poller.ranked(topics, min_new=min_new_items)
+    except Exception as e:
+        logger.exception(f"Error ranking topics: {e}")
+        ready = []
+
+    for topic in ready:
+        with in_flight_lock:
+            if topic in in_flight or time.time() - last_started.get(topic, 0) < topic_interval:
+                continue
+            in_flight.add(topic)
+        last_started[topic] = time.time()
+        logger.info(f"📰 Scheduling '{topic}' with {feed_poller.score(topic)} new items")
+        # Blocks while the feed stage is saturated, so work never piles up
+        pipeline.submit({"topic": topic, "started": last_started[topic]})
+
+    logger.info(f"📊 Stage stats: {pipeline.stats} | Feeds: {feed_poller.stats} | Artifacts: {artifacts.stats()} | Backgrounds: {backgrounds.stats}")
+    time.sleep(30)
@@ -1,27 +1,173 @@
 import json
 import datetime
 import os
+import time
+import threading
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from langchain_groq import ChatGroq
+from groq import BadRequestError
 from langchain_core.prompts import ChatPromptTemplate
 from dotenv import load_dotenv
 from scrape import scrape_save
-from audio import make_audio
-from video import create_video, generate_fullwidth_waveform_video
+from audio import make_audio, stream_audio, voice_settings
+from video import create_video, create_music_visualizer, generate_fullwidth_waveform_video, output_formats
 from upload import upload
-from image import create_bg_img
+from image import BackgroundService
+from job import Job, artifacts
+from artifact_store import ArtifactStore, file_digest
+from waveform import render_waveform_video
+from ffmpeg_runner import FFmpegError
+from transcript import build_transcript, estimate_tokens
+from llm_json import parse_llm_json, reask_messages, record_failure, failed_generation, stats as llm_json_stats
+from rate_limit import limits
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def post(user_input, language, model):
+# Pipe TTS bytes straight into ffmpeg instead of staging the audio file first
+stream_tts = os.getenv("STREAM_TTS", "1") == "1"
+# "showwaves" renders inside ffmpeg; "numpy" rasterises the waveform in Python from staged audio
+waveform_renderer = os.getenv("WAVEFORM_RENDERER", "showwaves")
+# Concurrent ffmpeg renders per post(); renders are CPU-bound, uploads and TTS are not
+render_slots = threading.BoundedSemaphore(int(os.getenv("RENDER_CONCURRENCY", 1)))
+logo = "LogoS.png"
+# Backgrounds are prefetched from the headline while scraping, scripting and TTS run
+backgrounds = BackgroundService(artifacts)
+groq = limits["groq"]
+# Expected reply size per language (60s script plus metadata), counted against Groq's tokens-per-minute with the prompt
+reply_tokens = 400
+
+
+class Timeline:
+    """Start/end times of each stage, relative to the start of the run, to verify overlap."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.events = []
+        self._lock = threading.Lock()
+
+    def run(self, stage, language, func, *args, **kwargs):
+        start = time.perf_counter() - self.started
+        try:
+            return func(*args, **kwargs)
+        finally:
+            end = time.perf_counter() - self.started
+            with self._lock:
+                self.events.append({"stage": stage, "language": language, "start": round(start, 2), "end": round(end, 2)})
+
+    def report(self):
+        for event in sorted(self.events, key=lambda e: e["start"]):
+            label = f"{event['stage']}[{event['language']}]" if event["language"] else event["stage"]
+            logger.info(f"⏱️ {label:<20} {event['start']:8.2f}s → {event['end']:8.2f}s")
+
+
+def audio_key(payload, language, model):
+    # Voice settings include the mood, so a re-voiced script gets a new key
+    return ArtifactStore.key("audio", payload["script"], language, model, voice_settings(payload, language, model))
+
+
+def synthesize(payload, language, model, job):
+    audio_name = job.cached(
+        f"audio:{language}", audio_key(payload, language, model), job.audio(language),
+        lambda: make_audio(payload, language=language, model=model, output_file=job.audio(language))
+    )
+    if not audio_name:
+        raise RuntimeError(f"{language} speech synthesis failed")
+    return audio_name
+
+
+def make_background(prompt, job):
+    """Background image for the job; joins a prefetch of the same prompt if one is running."""
+    if not job.reuse("background", backgrounds.key(prompt), job.background):
+        job.done("background", backgrounds.fetch(prompt, job.background))
+    return job.background
+
+
+def render(payload, language, model, logo, job, audio_name=None):
+    """Render one language, reusing stored renditions when none of the inputs changed."""
+    outputs = job.outputs(language, output_formats)
+    render_key = ArtifactStore.key(
+        "render", audio_key(payload, language, model), job.keys.get("background"),
+        file_digest(logo), job.profile, job.formats, waveform_renderer
+    )
+    stages = {name: (f"render:{language}:{name}", ArtifactStore.key("render", render_key, name)) for name in job.formats}
+    # Restore only a complete set, so a partial hit never leaves stale renditions behind
+    if all(job.store.has(key) for stage, key in stages.values()):
+        for spec, (stage, key) in zip(outputs, stages.values()):
+            job.reuse(stage, key, spec["path"])
+        return outputs[0]["path"]
+
+    video_name = render_outputs(payload, language, model, logo, job, audio_name=audio_name)
+    if video_name:
+        for spec, (stage, key) in zip(outputs, stages.values()):
+            if os.path.exists(spec["path"]):
+                job.save(stage, key, spec["path"])
+    return video_name
+
+
+def publish_video(payload, video_name, language, job):
+    """Upload once per rendition; a restarted job does not upload the same video twice."""
+    def send():
+        video_id = upload(data=payload, video_file=video_name, language=language)
+        return {"video_id": video_id} if video_id else None
+
+    rendition = job.keys.get(f"render:{language}:{job.formats[0]}") or file_digest(video_name)
+    result = job.cached_json(f"upload:{language}", ArtifactStore.key("upload", rendition, language), send)
+    return result["video_id"] if result else None
+
+
+def scripts(user_input, languages, articles, job):
+    """Scripts for every language, reused while the query, date and articles are unchanged.
+
+    An unfinished run of the same job keeps its script even if the articles
+    drifted since, so a retry does not re-voice and re-render everything.
+    """
+    sources = sorted((article.get("Url"), article.get("Content")) for article in articles if not article.get("Error"))
+    key = ArtifactStore.key("script", user_input, languages, datetime.date.today().isoformat(), sources)
+    return job.cached_json("script", key, lambda: generate_scripts(user_input, languages, articles), resume=True)
+
+
+def render_outputs(payload, language, model, logo, job, audio_name=None):
+    """Render one language; with ``audio_name`` the staged file is used instead of streaming."""
+    background = job.background if os.path.exists(job.background) else None
+    outputs = job.outputs(language, output_formats)
+
+    if waveform_renderer == "numpy":
+        audio_name = audio_name or synthesize(payload, language, model, job)
+        return render_waveform_video(audio_name,logo,output_file=job.output(language),language=language,background_image=background,profile=job.profile,outputs=outputs)
+
+    if stream_tts and audio_name is None:
+        audio_stream = stream_audio(payload, language, model)
+        if not background:
+            try:
+                return generate_fullwidth_waveform_video(None,logo,output_file=job.output(language),language=language,audio_stream=audio_stream,profile=job.profile,outputs=outputs)
+            except FFmpegError:
+                # The live first TTS segment is never retried, so a transient error lands here
+                pass
+        else:
+            ok, video_name = create_music_visualizer(None,logo,background,output_video=job.output(language),audio_stream=audio_stream,profile=job.profile,outputs=outputs)
+            if ok:
+                return video_name
+        # Streamed sentences are cached by now, so staging the file is cheap
+        logger.warning("Streamed render failed; retrying from staged audio.")
+
+    audio_name = audio_name or synthesize(payload, language, model, job)
+    if background:
+        return create_video(audio_name,logo,language,background,output_file=job.output(language),profile=job.profile,outputs=outputs)
+    return generate_fullwidth_waveform_video(audio_name,logo,output_file=job.output(language),language=language,profile=job.profile,outputs=outputs)
+
+
+def generate_scripts(user_input, languages, articles):
+    """One LLM call returning a {language: payload} dict, or None on failure."""
     # Load environment variables
     load_dotenv()
     os.environ["GROQ_API_KEY"] = os.getenv("GROQ_API_KEY")
 
-    logo = "LogoS.png"
     llm = ChatGroq(model="llama-3.3-70b-versatile", temperature=0.5)
+    # Groq's JSON mode keeps the reply to a bare object
+    structured_llm = llm.bind(response_format={"type": "json_object"})
 
     # Prompt template
     prompt = ChatPromptTemplate.from_messages([
@@ -29,22 +175,24 @@ def post(user_input, language, model):
             You are a professional scriptwriter for a YouTube news channel called "FactLine".
 
             Your job is to generate a Short script for a summary video based on news article transcripts on the topic: {topic}, covering Important details to help the listeners understand the news better. 
-            In the language {language}.
+            Write one version of the script in each of these languages: {languages}. Every version must report exactly the same facts.
             The final script should be suitable for a video lasting approximately 60 seconds. Prioritize the information from the articles with the most recent publish date and time.
 
-            You must output your response strictly in the following JSON format:
+            You must output your response strictly in the following JSON format, with one top-level key per language ({languages}):
 
             {{
-            "video_title": "[A very short, catchy, and relevant video title based on the topic and script] | {language} #Shorts",
-            "description": "[A clear and informative video description with hashtags related to the video content and script] #Shorts",
-            "tags": ["shorts", "[tag2]", "[tag3]", "..."],
+            "[Language]": {{
+                "video_title": "[A very short, catchy, and relevant video title based on the topic and script] | [Language] #Shorts",
+                "description": "[A clear and informative video description with hashtags related to the video content and script] #Shorts",
+                "tags": ["shorts", "[tag2]", "[tag3]", "..."],
 
-            "script": "[Your short {language} script goes here]",
-            "mood": "[Your mood description goes here, e.g., 'Speak in a Professional and sad tone']"
+                "script": "[Your short script in [Language] goes here]",
+                "mood": "[Your mood description goes here, e.g., 'Speak in a Professional and sad tone']"
+            }}
             }}
 
             Guidelines:
-            - Begin the script with today's date in this format: "It is [todaysdate] and you are watching FactLine." Replace [todaysdate] with {date} in plain {language}.
+            - Begin the script with today's date in this format: "It is [todaysdate] and you are watching FactLine." Replace [todaysdate] with {date} in plain words of that script's language.
             - Maintain the tone and factual relevance of the original news transcript(s). Do NOT add any opinions or additional facts.
             - If there are multiple articles or parts, summarize them in logical order, starting from the most recent one.
             - Use simple, engaging, and clear language suitable for a general audience. Keep sentences concise and avoid unnecessary elaboration to ensure the script fits within a 60-second video.
@@ -53,7 +201,7 @@ def post(user_input, language, model):
             - The video title should be catchy yet professional and directly related to the content.
             - The description should summarize the video content briefly and clearly.
             - Provide 3 to 7 relevant tags that describe the video topic and content.
-            - Strictly End the script with a sign-off like: "Thanks for watching FactLine. Stay informed and see you next time." in {language} .
+            - Strictly End the script with a sign-off like: "Thanks for watching FactLine. Stay informed and see you next time." in that script's language.
 
             Important:
             - Your output should follow the JSON structure exactly, and output nothing except for the JSON.
@@ -65,69 +213,163 @@ def post(user_input, language, model):
             """),  # (your long prompt here)
         ("user", "")
     ])
-    chain = prompt | llm
+    chain = prompt | structured_llm
 
     today = datetime.date.today()
     date = today.strftime("%B %d, %Y")
 
-    # Scrape and load transcript
-    scrape_save(user_input)
-    with open("news.txt", "r", encoding="utf-8") as f:
-        transcript = f.read()
+    usable = [item for item in articles if not item.get("Error")]
+    if not usable:
+        logger.error("No articles available for transcript. Aborting post().")
+        return None
+    transcript = build_transcript(usable)
+
+    schema_hint = (
+        "{" + ", ".join(f'"{language}": {{"video_title", "description", "tags", "script", "mood"}}' for language in languages) + "}"
+    )
 
     max_retries = 5
+    content = None
+    error = None  # Last JSON error, sent back with the broken reply on a re-ask
     for attempt in range(max_retries):
         try:
-            # Invoke LLM
-            logger.info(f"🔁 Attempt {attempt+1}: Getting response from Groq LLM...")
-            response = chain.invoke({
-                "topic": user_input,
-                "date": date,
-                "transcript": transcript,
-                "language": language,
-            })
-
-            content = response.content.strip()
-
-            # Strip code block markdown
-            if content.startswith("```json"):
-                content = content[8:-3].strip()
-            elif content.startswith("```"):
-                content = content[3:-3].strip()
-
-            # Try to parse JSON
-            data = json.loads(content)
+            try:
+                if content is None:
+                    # Full prompt with the transcript
+                    logger.info(f"🔁 Attempt {attempt+1}: Getting response from Groq LLM...")
+                    response = groq.call(chain.invoke, {
+                        "topic": user_input,
+                        "date": date,
+                        "transcript": transcript,
+                        "languages": ", ".join(languages),
+                    }, tokens=estimate_tokens(transcript) + reply_tokens * len(languages))
+                else:
+                    # Targeted re-ask: only the broken JSON goes back over the network
+                    logger.info(f"🔁 Attempt {attempt+1}: Asking Groq LLM to correct its JSON...")
+                    response = groq.call(structured_llm.invoke, reask_messages(content, error, schema_hint),
+                                         tokens=estimate_tokens(content) * 2)
+                content = response.content
+            except BadRequestError as e:
+                # JSON mode rejects malformed replies server-side; the rejected text
+                # comes back in the error and is repaired or re-asked like any other
+                content = failed_generation(e)
+                if content is None:
+                    raise
+                logger.warning("Groq rejected its JSON reply (json_validate_failed); repairing it locally.")
+                if not content:
+                    content = None
+                    raise json.JSONDecodeError("Empty failed generation", "", 0)
+
+            # Parse JSON, repairing locally before spending another call
+            data = parse_llm_json(content)
+            missing = [language for language in languages if not isinstance(data.get(language), dict)]
+            if missing:
+                # A JSON fix cannot recreate missing scripts, so re-send the full prompt
+                content = None
+                raise json.JSONDecodeError(f"Missing languages {missing}", "", 0)
             logger.info("JSON parsed successfully from LLM response.")
             break
 
         except json.JSONDecodeError as e:
+            error = e
             logger.warning(f"JSON decoding failed (Attempt {attempt+1}/{max_retries}): {e}")
             if attempt == max_retries - 1:
+                record_failure()
                 logger.error(" All JSON decode attempts failed. Aborting post().")
-                return
+                return None
             continue
 
         except Exception as e:
-            # Check for rate limit error
-            if "rate limit" in str(e).lower():
-                logger.error("Rate limit error from Groq. Exiting early.")
-                return
+            # Rate limits were already waited out and retried by the limiter
             logger.error(f"Unexpected error from LLM: {e}")
-            return  # Exit on unexpected exception
-
-    # Proceed with media generation
-    try:
-        audio_name = make_audio(data, language=language, model=model)
-        if language == "English":
-            create_bg_img(data["video_title"])
-        
-        if os.path.exists("background.png"):
-            video_name = create_video(audio_name,logo,language,"background.png")
-        else:
-            video_name = generate_fullwidth_waveform_video(audio_name,logo,language=language)
-        
-        if language == "Hindi":
-            os.remove("background.png")
-        upload(data=data, video_file=video_name, language=language)
-    except Exception as e:
-        logger.error(f"Failed during media generation or upload: {e}")
+            return None  # Exit on unexpected exception
+
+    logger.info(f"📊 LLM JSON stats: {llm_json_stats}")
+    return data
+
+
+def produce(data, languages, model, job, background_prompt=None):
+    """Run the media stages for every language as a small dependency graph.
+
+    Each render waits for the background (normally prefetched from the
+    headline or query, so already done) and then streams TTS straight into
+    ffmpeg; with ``STREAM_TTS=0`` or the numpy renderer, TTS is staged to a
+    file first and overlaps the background instead. Renders share
+    ``render_slots``, and each upload starts as soon as its render is done so
+    it overlaps with the next language's work.
+
+    Returns ``{language: video_id}``, with None for languages that failed.
+    """
+    timeline = Timeline()
+    needs_background = "English" in languages
+    # The background no longer forces staging: it is prefetched, and renders wait for it anyway
+    staged = not stream_tts or waveform_renderer == "numpy"
+
+    with ThreadPoolExecutor(max_workers=3 * len(languages) + 1) as pool:
+        background_future = None
+        if needs_background:
+            background_future = pool.submit(
+                timeline.run, "background", None, make_background, background_prompt or data["English"]["video_title"], job
+            )
+
+        audio_futures = {}
+        if staged:
+            for language in languages:
+                audio_futures[language] = pool.submit(timeline.run, "tts", language, synthesize, data[language], language, model, job)
+
+        def render_when_ready(language):
+            audio_name = audio_futures[language].result() if staged else None
+            if background_future is not None:
+                try:
+                    background_future.result()
+                except Exception as e:
+                    logger.error(f"Background generation failed, rendering without it: {e}")
+            with render_slots:
+                return timeline.run("render", language, render, data[language], language, model, logo, job, audio_name=audio_name)
+
+        def publish(language):
+            video_name = render_when_ready(language)
+            video_id = timeline.run("upload", language, publish_video, data[language], video_name, language, job)
+            logger.info(f"{language} Done")
+            return video_id
+
+        futures = {language: pool.submit(publish, language) for language in languages}
+        results = {}
+        for language, future in futures.items():
+            try:
+                results[language] = future.result()
+            except Exception as e:
+                results[language] = None
+                logger.error(f"Failed during {language} media generation or upload: {e}")
+
+    timeline.report()
+    return results
+
+
+def post(user_input, languages, model, articles=None, job=None):
+    # A single language is still accepted; every language shares one LLM call
+    if isinstance(languages, str):
+        languages = [languages]
+
+    # Without a shared job, run in a private workspace that is cleaned up afterwards
+    if job is None:
+        with Job(f"{user_input}-{'-'.join(languages)}") as own_job:
+            return post(user_input, languages, model, articles=articles, job=own_job)
+
+    # The query is enough to start the background, so it overlaps scraping and the LLM
+    if "English" in languages:
+        backgrounds.prefetch(user_input)
+
+    # Scrape only when the caller did not share a pre-scraped bundle
+    if articles is None:
+        articles = scrape_save(user_input)
+
+    data = scripts(user_input, languages, articles, job)
+    if data is None:
+        return
+
+    # Proceed with media generation, one payload per language
+    results = produce(data, languages, model, job, background_prompt=user_input)
+    if all(results.values()):
+        job.complete()
+    return results
@@ -0,0 +1,154 @@
+import os
+import time
+import random
+import threading
+import logging
+from email.utils import parsedate_to_datetime
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("rate_limit")
+
+retriable_status = {408, 429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """Refilling bucket; callers wait their turn in FIFO order instead of being rejected."""
+
+    def __init__(self, capacity, per_second):
+        self.capacity = float(capacity)
+        self.per_second = float(per_second)
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self._condition = threading.Condition()
+        self._next_ticket = 0
+        self._serving = 0
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.per_second)
+        self.updated = now
+
+    def acquire(self, amount=1, not_before=lambda: 0):
+        amount = min(float(amount), self.capacity)
+        with self._condition:
+            ticket = self._next_ticket
+            self._next_ticket += 1
+            while self._serving != ticket:
+                self._condition.wait()
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    wait = max(not_before() - now, (amount - self.tokens) / self.per_second if self.tokens < amount else 0)
+                    if wait <= 0:
+                        self.tokens -= amount
+                        return
+                    self._condition.wait(wait)
+            finally:
+                self._serving += 1
+                self._condition.notify_all()
+
+
+def status_of(error):
+    """HTTP status carried by an exception from any of the provider SDKs, if there is one."""
+    for candidate in (
+        getattr(error, "status_code", None),
+        getattr(getattr(error, "response", None), "status_code", None),
+        getattr(getattr(error, "resp", None), "status", None),
+        getattr(error, "code", None),
+    ):
+        if isinstance(candidate, int):
+            return candidate
+    if "rate limit" in str(error).lower():
+        return 429
+    return None
+
+
+def retry_after_of(error):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date), or None."""
+    headers = getattr(getattr(error, "response", None), "headers", None) or getattr(error, "resp", None) or {}
+    try:
+        value = headers.get("retry-after") or headers.get("Retry-After")
+    except AttributeError:
+        return None
+    if not value:
+        return None
+    try:
+        return max(float(value), 0)
+    except ValueError:
+        try:
+            return max(parsedate_to_datetime(value).timestamp() - time.time(), 0)
+        except (TypeError, ValueError):
+            return None
+
+
+class Provider:
+    """Request and token buckets for one external API, plus a shared retry/backoff policy.
+
+    When any caller is told to back off (429 or Retry-After), every caller
+    of the same provider waits, so the whole process slows down together
+    instead of hammering a quota that is already exhausted.
+    """
+
+    def __init__(self, name, requests_per_minute, tokens_per_minute=None, token_burst=None, max_retries=5, base_delay=2, max_delay=120):
+        self.name = name
+        self.requests = TokenBucket(max(requests_per_minute / 6, 1), requests_per_minute / 60)
+        self.tokens = TokenBucket(token_burst or tokens_per_minute, tokens_per_minute / 60) if tokens_per_minute else None
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "retries": 0, "throttled_seconds": 0.0}
+
+    def blocked_until(self):
+        return self._blocked_until
+
+    def pause(self, seconds):
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+    def acquire(self, tokens=0):
+        started = time.monotonic()
+        self.requests.acquire(1, not_before=self.blocked_until)
+        if self.tokens and tokens:
+            self.tokens.acquire(tokens, not_before=self.blocked_until)
+        with self._lock:
+            self.stats["calls"] += 1
+            self.stats["throttled_seconds"] += time.monotonic() - started
+
+    def call(self, func, *args, tokens=0, **kwargs):
+        for attempt in range(self.max_retries + 1):
+            self.acquire(tokens)
+            try:
+                return func(*args, **kwargs)
+            except Exception as e:
+                status = status_of(e)
+                if status not in retriable_status or attempt == self.max_retries:
+                    raise
+                delay = retry_after_of(e)
+                if delay is None:
+                    # Full jitter keeps concurrent callers from retrying in lockstep
+                    delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+                with self._lock:
+                    self.stats["retries"] += 1
+                logger.warning(f"⏳ {self.name} returned {status}; retry {attempt + 1}/{self.max_retries} in {delay:.1f}s")
+                self.pause(delay)
+
+
+def env_rate(name, default):
+    return float(os.getenv(name, default))
+
+
+# Process-wide limits; defaults follow each provider's published free/standard tier quotas
+limits = {
+    "groq": Provider("groq", env_rate("GROQ_RPM", 30), tokens_per_minute=env_rate("GROQ_TPM", 12000)),
+    "groq-instant": Provider("groq-instant", env_rate("GROQ_INSTANT_RPM", 30), tokens_per_minute=env_rate("GROQ_INSTANT_TPM", 6000)),
+    "stability": Provider("stability", env_rate("STABILITY_RPM", 150)),
+    "google_tts": Provider("google_tts", env_rate("GOOGLE_TTS_RPM", 1000)),
+    "openai_tts": Provider("openai_tts", env_rate("OPENAI_TTS_RPM", 50)),
+    # YouTube quota is in units per day: videos.insert costs 1600, playlistItems.insert 50
+    "youtube": Provider("youtube", env_rate("YOUTUBE_RPM", 60),
+                        tokens_per_minute=env_rate("YOUTUBE_UNITS_PER_DAY", 10000) / 1440,
+                        token_burst=env_rate("YOUTUBE_UNITS_PER_DAY", 10000)),
+}
@@ -0,0 +1,104 @@
+import time
+import queue
+import threading
+import logging
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("scheduler")
+
+
+class Stage:
+    """One pipeline step with its own worker count, queue bound and pacing.
+
+    ``func`` takes a work item (a dict) and returns it to pass it on, or None
+    to drop it. ``min_interval`` spaces out calls across all of the stage's
+    workers, which keeps a stage under its provider quota without fixed sleeps.
+    """
+
+    def __init__(self, name, func, workers=1, queue_size=2, min_interval=0):
+        self.name = name
+        self.func = func
+        self.workers = workers
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.min_interval = min_interval
+        self._next_start = 0.0
+        self._pace_lock = threading.Lock()
+
+    def pace(self):
+        with self._pace_lock:
+            now = time.monotonic()
+            wait = self._next_start - now
+            self._next_start = max(now, self._next_start) + self.min_interval
+        if wait > 0:
+            time.sleep(wait)
+
+
+class Pipeline:
+    """Bounded stage queues so different work items can be in different stages at once.
+
+    A full queue blocks the stage before it, so slow stages apply
+    backpressure instead of letting work pile up. ``on_finish(item, ok)`` is
+    called once per item when it leaves the pipeline, completed or not.
+    """
+
+    def __init__(self, stages, on_finish=None):
+        self.stages = stages
+        self.on_finish = on_finish
+        self._threads = []
+        self.stats = {stage.name: {"done": 0, "dropped": 0, "failed": 0, "seconds": 0.0} for stage in stages}
+        self._stats_lock = threading.Lock()
+
+    def start(self):
+        for index, stage in enumerate(self.stages):
+            for number in range(stage.workers):
+                thread = threading.Thread(target=self._work, args=(index,), name=f"{stage.name}-{number}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+        return self
+
+    def submit(self, item, block=True, timeout=None):
+        self.stages[0].queue.put(item, block=block, timeout=timeout)
+
+    def _record(self, stage, key, seconds):
+        with self._stats_lock:
+            self.stats[stage.name][key] += 1
+            self.stats[stage.name]["seconds"] += seconds
+
+    def _finish(self, item, ok):
+        if self.on_finish:
+            try:
+                self.on_finish(item, ok)
+            except Exception as e:
+                logger.error(f"on_finish failed: {e}")
+
+    def _work(self, index):
+        stage = self.stages[index]
+        following = self.stages[index + 1] if index + 1 < len(self.stages) else None
+        while True:
+            item = stage.queue.get()
+            stage.pace()
+            started = time.perf_counter()
+            try:
+                result = stage.func(item)
+            except Exception as e:
+                logger.error(f"Stage '{stage.name}' failed for {item.get('topic')}: {e}")
+                self._record(stage, "failed", time.perf_counter() - started)
+                self._finish(item, False)
+                continue
+            finally:
+                stage.queue.task_done()
+
+            elapsed = time.perf_counter() - started
+            if result is None:
+                logger.info(f"Stage '{stage.name}' dropped {item.get('topic')}")
+                self._record(stage, "dropped", elapsed)
+                self._finish(item, False)
+                continue
+
+            self._record(stage, "done", elapsed)
+            logger.info(f"✅ Stage '{stage.name}' finished {item.get('topic')} in {elapsed:.1f}s")
+            if following is None:
+                self._finish(result, True)
+            else:
+                following.queue.put(result)
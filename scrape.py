@@ -1,90 +1,207 @@
 import requests
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+from requests.adapters import HTTPAdapter
 from readability import Document
 from bs4 import BeautifulSoup  # For stripping HTML tags
 from googlenewsdecoder import gnewsdecoder
+from url_cache import DecodedUrlCache, decode_url
+from article_store import ArticleStore
+from feed_poller import FeedPoller, parse_items
 import logging
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("scraper")
 
-def scrape_save(query):
-    headers = {
-        "User-Agent": (
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:125.0) "
-            "Gecko/20100101 Firefox/125.0"
-        ),
-        "Accept": (
-            "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,"
-            "image/webp,*/*;q=0.8"
-        ),
-        "Accept-Language": "en-US,en;q=0.9",
-        "Referer": "https://www.google.com/",
-        "DNT": "1",  # Do Not Track
-        "Connection": "keep-alive",
-        "Upgrade-Insecure-Requests": "1",
-        "Sec-Fetch-Dest": "document",
-        "Sec-Fetch-Mode": "navigate",
-        "Sec-Fetch-Site": "cross-site",
+# Concurrency settings
+max_workers = 5          # Articles extracted in parallel
+per_host_limit = 2       # Simultaneous requests to a single publisher
+pool_size = 10           # Keep-alive connections kept per host
+max_hosts = 32           # Publisher sessions kept open; the least recently used is closed
+
+headers = {
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:125.0) "
+        "Gecko/20100101 Firefox/125.0"
+    ),
+    "Accept": (
+        "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,"
+        "image/webp,*/*;q=0.8"
+    ),
+    "Accept-Language": "en-US,en;q=0.9",
+    "Referer": "https://www.google.com/",
+    "DNT": "1",  # Do Not Track
+    "Connection": "keep-alive",
+    "Upgrade-Insecure-Requests": "1",
+    "Sec-Fetch-Dest": "document",
+    "Sec-Fetch-Mode": "navigate",
+    "Sec-Fetch-Site": "cross-site",
+}
+
+# One pooled keep-alive session and one concurrency gate per recently used host
+_sessions = OrderedDict()
+_hosts_lock = threading.Lock()
+
+# Google News link -> publisher URL, shared across languages and cycles
+url_cache = DecodedUrlCache()
+# Structured record of every article fetched, reused across cycles
+article_store = ArticleStore()
+
+
+class ExtractionError(Exception):
+    """Typed article extraction failure; ``kind`` is stored alongside the message."""
+
+    def __init__(self, kind, message):
+        super().__init__(message)
+        self.kind = kind
+
+
+def get_session(url):
+    host = urlparse(url).netloc
+    with _hosts_lock:
+        if host in _sessions:
+            _sessions.move_to_end(host)
+            return _sessions[host]
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        session.headers.update(headers)
+        _sessions[host] = session, threading.BoundedSemaphore(per_host_limit)
+        # Hosts in use were touched within the last few requests, so the oldest one is idle
+        while len(_sessions) > max_hosts:
+            _, (evicted, _) = _sessions.popitem(last=False)
+            evicted.close()
+        return _sessions[host]
+
+
+def fetch(url, timeout=10, extra_headers=None):
+    session, limit = get_session(url)
+    with limit:
+        response = session.get(url, timeout=timeout, headers=extra_headers)
+    response.raise_for_status()
+    return response
+
+
+def decode_google_news(link):
+    """Resolve a Google News link under the news.google.com per-host limit."""
+    _, limit = get_session(link)
+    with limit:
+        return gnewsdecoder(link, interval=10)
+
+
+# Conditional-GET RSS client shared with main.py's topic scheduler
+feed_poller = FeedPoller(fetch)
+
+
+def to_article(record):
+    """Shape a stored record into the article dict handed to post()."""
+    article = {
+        "Title": record["title"],
+        # Failed extractions have no text; post() filters them out by "Error"
+        "Content": record.get("text"),
+        "Published_On": record["pub_date"],
+        "Source": record["source"],
+        "Url": record["link"],
+        "Error": None,
     }
+    if record.get("error_kind"):
+        article["Error"] = {"kind": record["error_kind"], "message": record["error_message"]}
+    return article
+
 
+def scrape_save(query, store=article_store):
     def extract_article_content(url):
         try:
-            newurl = gnewsdecoder(url, interval=10)
-            decoded_url = newurl.get("decoded_url")
-            if not decoded_url:
-                raise ValueError("Decoded URL not found")
+            decoded_url = decode_url(url, decode_google_news, url_cache)
+        except Exception as e:
+            raise ExtractionError("decode", str(e))
+        if not decoded_url:
+            raise ExtractionError("decode", "Decoded URL not found")
 
-            response = requests.get(decoded_url, headers=headers, timeout=10)
-            response.raise_for_status()
+        try:
+            response = fetch(decoded_url)
+        except requests.exceptions.HTTPError as e:
+            raise ExtractionError("http", f"HTTP error: {e.response.status_code}")
+        except requests.exceptions.RequestException as e:
+            raise ExtractionError("network", str(e))
 
+        try:
             doc = Document(response.text)
             summary_html = doc.summary()
             soup = BeautifulSoup(summary_html, "html.parser")
             text_only = soup.get_text(separator="\n", strip=True)
+        except Exception as e:
+            raise ExtractionError("parse", str(e))
+        if not text_only:
+            raise ExtractionError("empty", "No readable text extracted")
 
-            return text_only
+        return decoded_url, text_only
 
-        except requests.exceptions.HTTPError as e:
-            logger.warning(f"HTTP error for {url}: {e.response.status_code}")
-            return {'error': f'HTTP error: {e.response.status_code}'}
-        except Exception as e:
-            logger.warning(f"Failed to extract content from {url}: {e}")
-            return {'error': str(e)}
+    def load_article(entry):
+        cached = store.get(entry["link"])
+        if cached:
+            logger.info(f"♻️ Reusing stored article: {entry['title']}")
+            return cached
+
+        started = time.perf_counter()
+        record = dict(entry)
+        try:
+            record["url"], record["text"] = extract_article_content(entry["link"])
+        except ExtractionError as e:
+            logger.warning(f"Failed to extract content from {entry['link']} ({e.kind}): {e}")
+            record["text"] = None
+            record["error_kind"], record["error_message"] = e.kind, str(e)
+        record["fetch_seconds"] = time.perf_counter() - started
+        return store.save(record)
 
     try:
         logger.info(f"🔍 Searching news for query: {query}")
         search = query
         url = f"https://news.google.com/rss/search?q={search}"
 
-        response = requests.get(url=url, headers=headers)
-        response.raise_for_status()
-
-        soup = BeautifulSoup(response.text, 'xml')
-        listnews = soup.find_all('item')[:5]
+        # One-off queries are fetched plainly; only the fixed topic feeds go through
+        # feed_poller, which would otherwise keep every query's body forever
+        listnews = parse_items(fetch(url).text, 5)
         if not listnews:
             logger.warning("No news items found.")
-            return
-
-        with open("news.txt", "w", encoding="utf-8") as n:
-            for i in listnews:
-                title = i.find('title').text
-                link = i.find('link').text
-                content = extract_article_content(link)
-                published_on = i.find('pubDate').text
-                source = i.find('source').text if i.find('source') else "Unknown"
-
-                item = {
-                    "Title": title,
-                    "Content": content,
-                    "Published_On": published_on,
-                    "Source": source
-                }
-                n.write(str(item) + "\n")
-
-        logger.info("✅ Data written to news.txt")
+            return []
+
+        entries = [
+            {
+                "link": i.find('link').text,
+                "title": i.find('title').text,
+                "pub_date": i.find('pubDate').text,
+                "source": i.find('source').text if i.find('source') else "Unknown",
+            }
+            for i in listnews
+        ]
+
+        # Extract all articles concurrently; map() keeps feed order
+        articles = []
+        seen = set()
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            for record in pool.map(load_article, entries):
+                # Syndicated copies arrive under different links with identical text
+                digest = record.get("content_hash")
+                if digest in seen:
+                    logger.info(f"🔁 Skipping duplicate article: {record['title']}")
+                    continue
+                if digest:
+                    seen.add(digest)
+                articles.append(to_article(record))
+
+        failed = sum(1 for article in articles if article["Error"])
+        logger.info(f"✅ Stored {len(articles) - failed} articles ({failed} failed)")
+        logger.info(f"🔗 Decoded URL cache: {url_cache.stats()}")
+        return articles
 
     except requests.exceptions.RequestException as e:
         logger.error(f"❌ Failed to fetch news RSS feed: {e}")
     except Exception as e:
         logger.exception(f"❌ Unexpected error in scrape_save: {e}")
+    return []
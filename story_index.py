@@ -0,0 +1,160 @@
+import os
+import hashlib
+import sqlite3
+import threading
+import time
+import logging
+import numpy as np
+from transcript import tokenize
+from headlines import clean_title, stopwords
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("story_index")
+
+index_path = os.getenv("STORY_INDEX_PATH", ".cache/stories.sqlite")
+headline_similarity = float(os.getenv("STORY_HEADLINE_SIMILARITY", 0.4))
+text_distance = int(os.getenv("STORY_TEXT_DISTANCE", 5))
+
+# Headlines: 32-value MinHash in 16 bands of 2 rows (pairs at Jaccard 0.4 collide ~93% of the time)
+minhash_size = 32
+minhash_rows = 2
+_rng = np.random.default_rng(20240601)
+_seeds = _rng.integers(0, 2**63, size=minhash_size, dtype=np.uint64)
+_multipliers = _rng.integers(0, 2**63, size=minhash_size, dtype=np.uint64) | np.uint64(1)
+
+# Article text: 64-bit SimHash in 8 bands of 8 bits (pairs within 7 bits always share a band)
+simhash_bands = 8
+band_bits = 64 // simhash_bands
+
+
+def feature_hashes(features):
+    return np.array(
+        [int.from_bytes(hashlib.blake2b(f.encode("utf-8"), digest_size=8).digest(), "big") for f in features],
+        dtype=np.uint64
+    )
+
+
+def headline_terms(title):
+    return set(w for w in tokenize(clean_title(title)) if w not in stopwords)
+
+
+def minhash(title):
+    """MinHash signature of a headline's word set; uint64 multiplication wraps, giving cheap permutations."""
+    hashes = feature_hashes(sorted(headline_terms(title)))
+    if not len(hashes):
+        return np.zeros(minhash_size, dtype=np.uint64)
+    return ((hashes[None, :] ^ _seeds[:, None]) * _multipliers[:, None]).min(axis=1)
+
+
+def minhash_bands(signature):
+    rows = signature.reshape(-1, minhash_rows)
+    return [
+        (band, int.from_bytes(hashlib.blake2b(row.tobytes(), digest_size=7).digest(), "big"))
+        for band, row in enumerate(rows)
+    ]
+
+
+def shingles(text):
+    words = tokenize(text)
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+def simhash(text):
+    """64-bit SimHash of word unigrams and bigrams, computed with vectorized bit sums."""
+    features = shingles(text)
+    if not features:
+        return 0
+    bits = (feature_hashes(features)[:, None] >> np.arange(64, dtype=np.uint64)) & np.uint64(1)
+    votes = bits.astype(np.int32).sum(axis=0) * 2 - len(features)
+    return int(sum(1 << int(i) for i in np.flatnonzero(votes > 0)))
+
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+
+def to_signed(value):
+    # SQLite integers are signed 64-bit
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def simhash_bands_of(signature):
+    mask = (1 << band_bits) - 1
+    return [(band, (signature >> (band * band_bits)) & mask) for band in range(simhash_bands)]
+
+
+class StoryIndex:
+    """Persistent index of stories already turned into videos.
+
+    Each story keeps a MinHash of its headline words (a 256-byte blob) and a
+    64-bit SimHash of its article text. Band rows (kind, band, value) are
+    indexed, so a near-duplicate query only compares against stories that
+    share a band instead of scanning every story.
+    """
+
+    def __init__(self, path=index_path):
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript(
+            "CREATE TABLE IF NOT EXISTS stories ("
+            "id INTEGER PRIMARY KEY, topic TEXT, title TEXT, headline_sig BLOB, text_hash INTEGER, created REAL);"
+            "CREATE TABLE IF NOT EXISTS bands ("
+            "kind TEXT, band INTEGER, value INTEGER, story_id INTEGER);"
+            "CREATE INDEX IF NOT EXISTS bands_lookup ON bands (kind, band, value);"
+        )
+        self._db.commit()
+
+    def add(self, topic, title, text=""):
+        signature = minhash(title)
+        text_hash = simhash(text) if text else None
+        with self._lock:
+            cursor = self._db.execute(
+                "INSERT INTO stories (topic, title, headline_sig, text_hash, created) VALUES (?, ?, ?, ?, ?)",
+                (topic, title, signature.tobytes(), to_signed(text_hash) if text_hash is not None else None, time.time())
+            )
+            story_id = cursor.lastrowid
+            rows = [("headline", band, value, story_id) for band, value in minhash_bands(signature)]
+            if text_hash is not None:
+                rows += [("text", band, value, story_id) for band, value in simhash_bands_of(text_hash)]
+            self._db.executemany("INSERT INTO bands (kind, band, value, story_id) VALUES (?, ?, ?, ?)", rows)
+            self._db.commit()
+        return story_id
+
+    def _candidates(self, kind, column, band_pairs):
+        clauses = " OR ".join("(b.band = ? AND b.value = ?)" for _ in band_pairs)
+        params = [kind] + [v for pair in band_pairs for v in pair]
+        with self._lock:
+            return self._db.execute(
+                f"SELECT DISTINCT s.id, s.title, s.{column} FROM bands b JOIN stories s ON s.id = b.story_id "
+                f"WHERE b.kind = ? AND ({clauses})",
+                params
+            ).fetchall()
+
+    def covered_headline(self, title, min_similarity=headline_similarity):
+        """Most similar covered story as (estimated Jaccard, id, title), or None."""
+        signature = minhash(title)
+        if not signature.any():
+            return None
+        matches = [
+            (float(np.mean(np.frombuffer(stored, dtype=np.uint64) == signature)), story_id, stored_title)
+            for story_id, stored_title, stored in self._candidates("headline", "headline_sig", minhash_bands(signature))
+        ]
+        matches = [m for m in matches if m[0] >= min_similarity]
+        return max(matches) if matches else None
+
+    def covered_text(self, text, max_distance=text_distance):
+        """Closest covered story by article text as (Hamming distance, id, title), or None."""
+        if not text:
+            return None
+        signature = simhash(text)
+        matches = [
+            (hamming(signature, stored & ((1 << 64) - 1)), story_id, stored_title)
+            for story_id, stored_title, stored in self._candidates("text", "text_hash", simhash_bands_of(signature))
+            if stored is not None
+        ]
+        matches = [m for m in matches if m[0] <= max_distance]
+        return min(matches) if matches else None
@@ -0,0 +1,131 @@
+import os
+import re
+import math
+import logging
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+import numpy as np
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("transcript")
+
+token_budget = int(os.getenv("TRANSCRIPT_TOKEN_BUDGET", 3000))
+recency_half_life_hours = float(os.getenv("TRANSCRIPT_HALF_LIFE_HOURS", 12))
+# Cosine similarity above which a sentence repeats one already picked (wire copy across outlets)
+redundancy_threshold = float(os.getenv("TRANSCRIPT_REDUNDANCY", 0.8))
+
+_sentence_split = re.compile(r"(?<=[.!?।])\s+|\n+")
+_word = re.compile(r"\w+", re.UNICODE)
+
+
+def estimate_tokens(text):
+    # Roughly four characters per token for the Llama tokenizer on news prose
+    return len(text) // 4 + 1
+
+
+def split_sentences(text):
+    return [s.strip() for s in _sentence_split.split(text or "") if len(s.strip()) > 20]
+
+
+def tokenize(text):
+    return [w.lower() for w in _word.findall(text)]
+
+
+def tfidf_matrix(documents):
+    """L2-normalised TF-IDF rows for a list of strings."""
+    tokenized = [tokenize(doc) for doc in documents]
+    vocab = {}
+    for tokens in tokenized:
+        for token in tokens:
+            vocab.setdefault(token, len(vocab))
+    counts = np.zeros((len(documents), max(len(vocab), 1)), dtype=np.float32)
+    for row, tokens in enumerate(tokenized):
+        for token in tokens:
+            counts[row, vocab[token]] += 1
+
+    df = np.count_nonzero(counts, axis=0)
+    idf = np.log((1 + len(documents)) / (1 + df)) + 1
+    weights = np.log1p(counts) * idf
+    norms = np.linalg.norm(weights, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return weights / norms, vocab
+
+
+def published_at(article):
+    try:
+        return parsedate_to_datetime(article.get("Published_On"))
+    except (TypeError, ValueError):
+        return None
+
+
+def recency_weights(articles, now=None):
+    now = now or datetime.now(timezone.utc)
+    weights = []
+    for article in articles:
+        when = published_at(article)
+        if when is None:
+            weights.append(0.5)
+            continue
+        age_hours = max((now - when).total_seconds() / 3600, 0)
+        weights.append(math.pow(0.5, age_hours / recency_half_life_hours))
+    return np.array(weights, dtype=np.float32)
+
+
+def build_transcript(articles, budget=token_budget):
+    """Extractively summarise articles into a transcript that fits ``budget`` tokens.
+
+    Sentences are scored by TF-IDF similarity to the centroid of all coverage,
+    weighted by how recent their article is, then picked greedily until the
+    budget is spent. A sentence too similar to one already picked is skipped,
+    so syndicated copy repeated across outlets does not crowd out unique facts. Articles are emitted newest first with their chosen
+    sentences kept in original order.
+    """
+    articles = sorted(
+        articles,
+        key=lambda a: published_at(a) or datetime.min.replace(tzinfo=timezone.utc),
+        reverse=True
+    )
+
+    def header(article, content):
+        return str({
+            "Title": article["Title"],
+            "Content": content,
+            "Published_On": article["Published_On"],
+            "Source": article["Source"],
+        })
+
+    sentences, owners = [], []
+    for index, article in enumerate(articles):
+        for sentence in split_sentences(article.get("Content")):
+            sentences.append(sentence)
+            owners.append(index)
+
+    remaining = budget - sum(estimate_tokens(header(a, "")) for a in articles)
+    chosen = set()
+    if sentences and remaining > 0:
+        matrix, _ = tfidf_matrix(sentences)
+        centroid = matrix.mean(axis=0)
+        scores = matrix @ centroid
+        scores *= recency_weights(articles)[np.array(owners)]
+        for index in np.argsort(-scores):
+            cost = estimate_tokens(sentences[index]) + 1
+            if cost > remaining:
+                continue
+            # Rows are L2-normalised, so the dot product is the cosine similarity
+            if chosen and (matrix[sorted(chosen)] @ matrix[index]).max() > redundancy_threshold:
+                continue
+            chosen.add(int(index))
+            remaining -= cost
+
+    lines = []
+    for index, article in enumerate(articles):
+        picked = [s for i, s in enumerate(sentences) if i in chosen and owners[i] == index]
+        lines.append(header(article, " ".join(picked)))
+    transcript = "\n".join(lines)
+
+    logger.info(
+        f"📝 Transcript: {len(chosen)}/{len(sentences)} sentences, "
+        f"~{estimate_tokens(transcript)} tokens (budget {budget})"
+    )
+    return transcript
@@ -1,14 +1,22 @@
 import os
+import time
+import random
 import base64
 import pickle
 import json
+import threading
 import logging
+import datetime
+import httplib2
+import google_auth_httplib2
 from google.auth.transport.requests import Request
 from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
+from googleapiclient.discovery import build, build_from_document
 from googleapiclient.errors import HttpError
 from googleapiclient.http import MediaFileUpload
 from dotenv import load_dotenv
+from rate_limit import limits
+from artifact_store import file_digest
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -16,7 +24,73 @@ logger = logging.getLogger("uploader")
 
 load_dotenv(override=True)
 
-def authenticate(scopes):
+# Resumable upload settings; chunks must be a multiple of 256 KiB
+chunk_size = int(os.getenv("UPLOAD_CHUNK_MB", 8)) * 1024 * 1024
+max_retries = int(os.getenv("UPLOAD_MAX_RETRIES", 8))
+# Data API quota units per call, drawn from the shared daily budget
+youtube_quota = limits["youtube"]
+insert_cost = 1600
+playlist_insert_cost = 50
+sessions_path = os.getenv("UPLOAD_SESSIONS_PATH", ".cache/upload_sessions.json")
+_sessions_lock = threading.Lock()
+
+scopes = ["https://www.googleapis.com/auth/youtube"]
+# Optional local copy of the YouTube discovery document; otherwise the one bundled with the client library is used
+discovery_path = os.getenv("YOUTUBE_DISCOVERY_PATH")
+refresh_margin = int(os.getenv("OAUTH_REFRESH_MARGIN", 300))
+# Backoff between failed background refreshes, doubling up to the cap
+refresh_retry_min = 60
+refresh_retry_max = 3600
+
+
+class AuthenticationError(Exception):
+    """Stored credentials are missing or cannot be refreshed without a browser."""
+
+
+def load_sessions():
+    try:
+        with open(sessions_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def save_session(key, session):
+    """Persist (or with session=None, drop) the resumable session for a file digest."""
+    with _sessions_lock:
+        sessions = load_sessions()
+        if session is None:
+            sessions.pop(key, None)
+        else:
+            sessions[key] = session
+        os.makedirs(os.path.dirname(sessions_path) or ".", exist_ok=True)
+        partial = f"{sessions_path}.tmp"
+        with open(partial, "w", encoding="utf-8") as f:
+            json.dump(sessions, f, indent=2)
+        os.replace(partial, sessions_path)
+
+def committed_offset(http, uri, size):
+    """Ask the server how much of a resumable session it holds.
+
+    Returns ``(offset, None)`` for a session still in progress, ``(size, video)``
+    when the earlier run already finished the upload, or ``(None, None)`` when
+    the session has expired.
+    """
+    response, content = http.request(
+        uri, method="PUT", body=b"", headers={"Content-Length": "0", "Content-Range": f"bytes */{size}"}
+    )
+    if response.status == 308:
+        # "Range: bytes=0-N" lists the committed bytes; no header means nothing was kept
+        committed = response.get("range")
+        return (int(committed.rsplit("-", 1)[1]) + 1 if committed else 0), None
+    if response.status in (200, 201):
+        return size, json.loads(content)
+    if response.status in (404, 410):
+        return None, None
+    raise HttpError(response, content, uri=uri)
+
+
+def authenticate(scopes, interactive=False):
     creds = None
     token_b64 = os.getenv("GOOGLE_OAUTH_TOKEN")
 
@@ -30,6 +104,9 @@ def authenticate(scopes):
             creds = None
 
     if not creds or not creds.valid or not token_b64:
+        if not interactive:
+            # Unattended runs must never block on a browser; run `python upload.py` to authorize
+            raise AuthenticationError("GOOGLE_OAUTH_TOKEN is missing or invalid; run `python upload.py` to authorize.")
         logger.info("Launching browser for Google OAuth...")
         flow = InstalledAppFlow.from_client_secrets_file("creds.json", scopes)
         creds = flow.run_local_server(port=0)
@@ -47,10 +124,75 @@ def authenticate(scopes):
     return creds
 
 
+class YouTubeUploader:
+    """Process-wide YouTube client with cached credentials.
+
+    Credentials are loaded and the discovery client is built once. A
+    background timer refreshes the token ``refresh_margin`` seconds before it
+    expires, so uploads never pay for auth setup or fall back to the browser.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._timer = None
+        self._retry_delay = refresh_retry_min
+        self.creds = authenticate(scopes)
+        if discovery_path:
+            with open(discovery_path, "r", encoding="utf-8") as f:
+                self.youtube = build_from_document(f.read(), credentials=self.creds)
+        else:
+            self.youtube = build("youtube", "v3", credentials=self.creds, static_discovery=True)
+        self._schedule_refresh()
+
+    def _schedule_refresh(self, delay=None):
+        if delay is None:
+            if not self.creds.expiry:
+                return
+            expiry = self.creds.expiry.replace(tzinfo=datetime.timezone.utc)
+            delay = (expiry - datetime.datetime.now(datetime.timezone.utc)).total_seconds() - refresh_margin
+        self._timer = threading.Timer(max(delay, 0), self.refresh)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def refresh(self):
+        with self._lock:
+            try:
+                self.creds.refresh(Request())
+                self._retry_delay = refresh_retry_min
+                logger.info("🔑 Refreshed YouTube OAuth token in the background.")
+            except Exception as e:
+                # The expiry did not move, so rescheduling from it would fire again at once
+                delay = self._retry_delay
+                self._retry_delay = min(self._retry_delay * 2, refresh_retry_max)
+                logger.error("Background token refresh failed, retrying in %ss: %s", delay, e)
+                self._schedule_refresh(delay)
+                return
+        self._schedule_refresh()
+
+    @property
+    def http(self):
+        """Authorized transport for the calling thread; httplib2 is not thread-safe."""
+        if not hasattr(self._local, "http"):
+            self._local.http = google_auth_httplib2.AuthorizedHttp(self.creds, http=httplib2.Http())
+        return self._local.http
+
+
+_uploader = None
+_uploader_lock = threading.Lock()
+
+
+def get_uploader():
+    global _uploader
+    with _uploader_lock:
+        if _uploader is None:
+            _uploader = YouTubeUploader()
+        return _uploader
+
+
 def upload(data, video_file, language):
-    scopes = ["https://www.googleapis.com/auth/youtube"]
-    creds = authenticate(scopes)
-    youtube = build("youtube", "v3", credentials=creds)
+    service = get_uploader()
+    youtube = service.youtube
 
     English_Playlist = os.getenv("ENGLISH")
     Hindi_Playlist = os.getenv("HINDI")
@@ -70,7 +212,7 @@ def upload(data, video_file, language):
                 }
             }
 
-            media_file = MediaFileUpload(file_path, chunksize=-1, resumable=True, mimetype="video/*")
+            media_file = MediaFileUpload(file_path, chunksize=chunk_size, resumable=True, mimetype="video/*")
 
             request = youtube.videos().insert(
                 part="snippet,status",
@@ -78,11 +220,69 @@ def upload(data, video_file, language):
                 media_body=media_file
             )
 
+            # A session saved by an earlier (possibly crashed) run continues where it stopped
+            key = file_digest(file_path)
+            saved = load_sessions().get(key)
             response = None
+            start_offset = 0
+            if saved:
+                start_offset, response = committed_offset(service.http, saved["uri"], os.path.getsize(file_path))
+                if start_offset is None:
+                    logger.warning("Saved upload session expired, starting a new one.")
+                    save_session(key, None)
+                    saved = None
+                    start_offset = 0
+                else:
+                    # next_chunk sends the file from resumable_progress onwards
+                    request.resumable_uri = saved["uri"]
+                    request.resumable_progress = start_offset
+                    logger.info(f"♻️ Resuming upload of {title} from byte {start_offset}")
+            if not saved:
+                # videos.insert is charged once per upload, not per chunk
+                youtube_quota.acquire(tokens=insert_cost)
+
+            retries = 0
+            started = time.perf_counter()
             while response is None:
-                status, response = request.next_chunk()
-                if status:
-                    logger.info(f"📤 Upload progress: {int(status.progress() * 100)}%")
+                try:
+                    # 429/5xx and Retry-After go through the shared policy, pausing every YouTube caller
+                    status, response = youtube_quota.call(request.next_chunk, http=service.http)
+                    retries = 0
+                    if response is None and request.resumable_uri:
+                        save_session(key, {
+                            "uri": request.resumable_uri,
+                            "offset": request.resumable_progress,
+                            "path": file_path,
+                            "title": title,
+                        })
+                    if status:
+                        elapsed = time.perf_counter() - started
+                        rate = (request.resumable_progress - start_offset) / elapsed / 1_048_576 if elapsed else 0
+                        logger.info(f"📤 Upload progress: {int(status.progress() * 100)}% ({rate:.2f} MiB/s)")
+                except HttpError as e:
+                    if e.resp.status in (404, 410) and request.resumable_uri and retries < max_retries:
+                        # The session expired server-side; start a fresh one
+                        retries += 1
+                        logger.warning("Upload session expired, restarting from byte zero.")
+                        save_session(key, None)
+                        request.resumable_uri = None
+                        request.resumable_progress = 0
+                        start_offset = 0
+                        continue
+                    raise
+                except (ConnectionError, TimeoutError, OSError) as e:
+                    if retries >= max_retries:
+                        raise
+                    retries += 1
+                    delay = min(2 ** retries, 64) + random.random()
+                    logger.warning(f"Network error during upload ({e}); retry {retries}/{max_retries} in {delay:.1f}s")
+                    time.sleep(delay)
+
+            save_session(key, None)
+            elapsed = time.perf_counter() - started
+            size = os.path.getsize(file_path)
+            logger.info(f"📊 Uploaded {(size - start_offset) / 1_048_576:.1f} MiB in {elapsed:.1f}s "
+                        f"({(size - start_offset) / elapsed / 1_048_576 if elapsed else 0:.2f} MiB/s)")
 
             video_id = response.get("id")
             logger.info("✅ Upload complete! Video ID: %s", video_id)
@@ -112,7 +312,7 @@ def upload(data, video_file, language):
                     }
                 }
             )
-            response = request.execute()
+            response = youtube_quota.call(request.execute, http=service.http, tokens=playlist_insert_cost)
             logger.info(f"🎬 Added video to {language} playlist.")
             return response
         except HttpError as e:
@@ -129,3 +329,9 @@ def upload(data, video_file, language):
         category_id=25
     )
     add_to_playlist(video_id)
+    return video_id
+
+
+if __name__ == "__main__":
+    # One-time interactive authorization; stores GOOGLE_OAUTH_TOKEN in .env
+    authenticate(scopes, interactive=True)
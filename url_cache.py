@@ -0,0 +1,86 @@
+import os
+import sqlite3
+import threading
+import time
+import logging
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("url_cache")
+
+cache_path = os.getenv("URL_CACHE_PATH", ".cache/urls.sqlite")
+ttl_seconds = int(os.getenv("URL_CACHE_TTL", 7 * 24 * 3600))
+max_entries = int(os.getenv("URL_CACHE_MAX_ENTRIES", 5000))
+
+
+class DecodedUrlCache:
+    """On-disk map of Google News links to their decoded publisher URLs."""
+
+    def __init__(self, path=cache_path, ttl=ttl_seconds, max_size=max_entries):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS decoded ("
+            "link TEXT PRIMARY KEY, url TEXT NOT NULL, "
+            "created REAL NOT NULL, used REAL NOT NULL)"
+        )
+        self._db.commit()
+
+    def get(self, link):
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT url, created FROM decoded WHERE link = ?", (link,)
+            ).fetchone()
+            if row is None or now - row[1] > self.ttl:
+                self.misses += 1
+                return None
+            self._db.execute("UPDATE decoded SET used = ? WHERE link = ?", (now, link))
+            self._db.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, link, url):
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO decoded (link, url, created, used) VALUES (?, ?, ?, ?)",
+                (link, url, now, now)
+            )
+            self._evict(now)
+            self._db.commit()
+
+    def _evict(self, now):
+        # Expired entries go first, then the least recently used beyond max_size
+        self._db.execute("DELETE FROM decoded WHERE created < ?", (now - self.ttl,))
+        self._db.execute(
+            "DELETE FROM decoded WHERE link IN ("
+            "SELECT link FROM decoded ORDER BY used DESC LIMIT -1 OFFSET ?)",
+            (self.max_size,)
+        )
+
+    def stats(self):
+        with self._lock:
+            size = self._db.execute("SELECT COUNT(*) FROM decoded").fetchone()[0]
+        return {"hits": self.hits, "misses": self.misses, "size": size}
+
+
+def decode_url(link, decoder, cache):
+    """Return the publisher URL for a Google News link, decoding only on a cache miss."""
+    decoded_url = cache.get(link)
+    if decoded_url:
+        return decoded_url
+
+    newurl = decoder(link)
+    decoded_url = newurl.get("decoded_url")
+    if decoded_url:
+        cache.put(link, decoded_url)
+    return decoded_url
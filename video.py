@@ -1,73 +1,175 @@
 import subprocess
-import re
-from tqdm import tqdm
+import tempfile
 import logging
 import os
+from ffmpeg_runner import run_ffmpeg, FFmpegError
+from artifact_store import ArtifactStore, artifacts, file_digest
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("video_generator")
 
+# Named encoder settings; "publish" is what goes to YouTube by default
+render_profiles = {
+    "fast-draft": {"fps": 24, "preset": "ultrafast", "tune": "zerolatency", "crf": 30, "threads": 0, "audio_bitrate": "96k"},
+    "publish": {"fps": 30, "preset": "veryfast", "tune": "animation", "crf": 23, "threads": 0, "audio_bitrate": "128k"},
+    "archive": {"fps": 60, "preset": "slow", "tune": "animation", "crf": 18, "threads": 0, "audio_bitrate": "192k"},
+    "preview": {"fps": 24, "preset": "veryfast", "tune": "animation", "crf": 32, "threads": 0, "audio_bitrate": "64k"},
+}
+default_profile = os.getenv("RENDER_PROFILE", "publish")
 
-def create_music_visualizer(audio, logo_image, background_image):
-    # File paths
-    output_video = "output.mp4"
+# Renditions that can be encoded from the same render; "fit" is pad (letterbox) or crop
+output_formats = {
+    "short": {"width": 768, "height": 1344},
+    "square": {"width": 768, "height": 768, "fit": "pad"},
+    "preview": {"width": 384, "height": 672, "profile": "preview"},
+}
+
+
+def get_profile(profile=None):
+    name = profile or default_profile
+    if name not in render_profiles:
+        raise ValueError(f"Unknown render profile '{name}'. Choose from {list(render_profiles)}")
+    return render_profiles[name]
+
+
+def encoder_args(profile=None):
+    """ffmpeg output options for a render profile (threads=0 lets x264 use every core)."""
+    settings = get_profile(profile)
+    return [
+        "-c:v", "libx264",
+        "-preset", settings["preset"],
+        "-tune", settings["tune"],
+        "-crf", str(settings["crf"]),
+        "-threads", str(settings["threads"]),
+        "-pix_fmt", "yuv420p",
+        "-r", str(settings["fps"]),
+        "-c:a", "aac",
+        "-b:a", settings["audio_bitrate"],
+    ]
+
+
+def output_args(outputs, video_label, audio_map, width, height, profile=None):
+    """Fan one rendered stream out to every output spec.
+
+    Returns a filter-graph suffix that splits ``video_label`` and resizes each
+    branch, plus the per-output ``-map``/encoder options. Each spec is a dict
+    with ``path`` and optional ``width``, ``height``, ``fit`` and ``profile``,
+    so extra renditions cost one encoder each rather than a whole new render.
+    """
+    branches = "".join(f"[out{i}]" for i in range(len(outputs)))
+    graph = [f"[{video_label}]split={len(outputs)}{branches}"]
+    args = []
+    for i, spec in enumerate(outputs):
+        w, h = spec.get("width", width), spec.get("height", height)
+        label = f"out{i}"
+        if (w, h) != (width, height):
+            if spec.get("fit", "pad") == "crop":
+                resize = f"scale={w}:{h}:force_original_aspect_ratio=increase,crop={w}:{h}"
+            else:
+                resize = f"scale={w}:{h}:force_original_aspect_ratio=decrease,pad={w}:{h}:(ow-iw)/2:(oh-ih)/2"
+            graph.append(f"[out{i}]{resize},setsar=1[sized{i}]")
+            label = f"sized{i}"
+        args += ["-map", f"[{label}]", "-map", audio_map, *encoder_args(spec.get("profile", profile)), "-shortest", spec["path"]]
+    return ";" + ";".join(graph), args
+
+
+def static_plate(background_image, width, height, text_content, font_size, dest):
+    """Composite the background and disclaimer once and write the PNG to ``dest``.
+
+    The plate is kept in the artifact store keyed by the input bytes and
+    layout, so every language that shares a background reuses the same image
+    and ffmpeg only has to overlay the waveform per frame. The logo sits
+    inside the waveform band, so it is overlaid after the waves rather than
+    baked in here.
+    """
+    key = ArtifactStore.key("plate", file_digest(background_image), width, height, font_size, text_content)
+    if artifacts.get(key, dest):
+        logger.info(f"♻️ Reusing static plate: {dest}")
+        return dest
+
+    subprocess.run([
+        "ffmpeg", "-y",
+        "-i", background_image,
+        "-filter_complex",
+        (
+            f"[0:v]scale={width}:{height}[bg];"
+            f"[bg]drawtext=text='{text_content}':fontcolor=white:fontsize={font_size}:x=20:y=20[plate]"
+        ),
+        "-map", "[plate]",
+        "-frames:v", "1",
+        dest
+    ], capture_output=True, check=True)
+    artifacts.put(key, dest, "plate")
+    logger.info(f"🖼️ Rendered static plate: {dest}")
+    return dest
+
+
+def create_music_visualizer(audio, logo_image, background_image, output_video="output.mp4", audio_stream=None, profile=None, outputs=None):
     # Video settings
     width = 768
     height = 1344
+    fps = get_profile(profile)["fps"]
     
     # Text settings
     text_content = "This is an AI Generated Image and is NOT real"  # Change this to your desired text
     font_size = 24
     
-    # Check if required files exist
-    required_files = [audio, background_image, logo_image]
+    # Check if required files exist; streamed audio arrives on stdin instead
+    required_files = [background_image, logo_image] + ([] if audio_stream is not None else [audio])
     for file in required_files:
         if not os.path.exists(file):
             print(f"Error: {file} not found in current directory")
-            return False
+            return False, None
+
+    # Background and disclaimer never change, so they are composited once
+    try:
+        plate = static_plate(
+            background_image, width, height, text_content, font_size,
+            f"{os.path.splitext(output_video)[0]}-plate.png"
+        )
+    except (subprocess.CalledProcessError, FileNotFoundError) as e:
+        logger.error(f"❌ Failed to render static plate: {e}")
+        return False, None
+
+    # Every requested rendition is encoded from this single pass
+    outputs = outputs or [{"path": output_video}]
+    output_video = outputs[0]["path"]
+    split_graph, output_options = output_args(outputs, "final", "0:a", width, height, profile)
     
     # FFmpeg command with showwaves filter for full-width waveform
     ffmpeg_cmd = [
         "ffmpeg",
         "-y",  # Overwrite output file if it exists
-        "-i", audio,  # Input audio
-        "-i", background_image,  # Input background image
-        "-i", logo_image,  # Input logo image
+        "-i", "pipe:0" if audio_stream is not None else audio,  # Input audio
+        "-loop", "1", "-framerate", str(fps),
+        "-i", plate,  # Pre-composited static layer
+        "-i", logo_image,
         "-filter_complex",
         f"""
-        [0:a]aformat=channel_layouts=mono,showwaves=s={width}x{height//8}:mode=line:colors=white:draw=full[waves];
+        [0:a]aformat=channel_layouts=mono,showwaves=s={width}x{height//8}:mode=line:rate={fps}:colors=white:draw=full[waves];
         [waves]format=rgba,colorchannelmixer=aa=0.6[waves_transparent];
-        [1:v]scale={width}:{height}[bg];
-        [bg][waves_transparent]overlay=0:{height*9//10}[bg_with_waves];
-        [bg_with_waves]drawtext=text='{text_content}':fontcolor=white:fontsize={font_size}:x=20:y=20[bg_with_text];
+        [1:v][waves_transparent]overlay=0:{height*9//10}:shortest=1[with_waves];
         [2:v]scale=60:60[logo_scaled];
-        [bg_with_text][logo_scaled]overlay={width-80}:{height-80}[final]
-        """,
-        "-map", "[final]",  # Use the final video stream
-        "-map", "0:a",      # Use the original audio stream
-        "-c:v", "libx264",  # Video codec
-        "-c:a", "aac",      # Audio codec
-        "-pix_fmt", "yuv420p",  # Pixel format for compatibility
-        "-r", "80",         # Frame rate for smoother animation
-        "-shortest",        # End when shortest input ends
-        output_video
+        [with_waves][logo_scaled]overlay={width-80}:{height-80}[final]
+        """ + split_graph,
+        *output_options,    # One encoder per output: final video, original audio, profile settings, -shortest
     ]
     
     
     try:
         # Run FFmpeg command
-        result = subprocess.run(ffmpeg_cmd, 
-                              capture_output=True, 
-                              text=True, 
-                              check=True)
+        duration = None if audio_stream is not None else get_audio_duration(audio)
+        run_ffmpeg(ffmpeg_cmd, duration=duration, input_stream=audio_stream, label="visualizer")
         
-        print(f"Output file: {output_video}")
+        logger.info(f"Output files: {[spec['path'] for spec in outputs]}")
         
-    except subprocess.CalledProcessError as e:
+    except FFmpegError as e:
+        logger.error(f"❌ Music visualizer render failed: {e}")
         return False , None
     
     except FileNotFoundError:
+        logger.error("❌ ffmpeg not found on PATH")
         return False , None
     
     return True , output_video
@@ -86,76 +188,72 @@ def get_audio_duration(filename):
         raise
 
 
-def generate_fullwidth_waveform_video(audio_file, logo_file, output_file="output.mp4", language="English"):
+def generate_fullwidth_waveform_video(audio_file, logo_file, output_file="output.mp4", language="English", audio_stream=None, profile=None, outputs=None):
+    tee_path = None
     try:
         width = 768
         height = 1344
+        fps = get_profile(profile)["fps"]
         waveform_height = 300
         color = "FF6462" if language == "Hindi" else "00FF00"
+        outputs = outputs or [{"path": output_file}]
+        output_file = outputs[0]["path"]
+        split_graph, output_options = output_args(outputs, "vid", "0:a", width, height, profile)
 
         ffmpeg_cmd = [
             'ffmpeg',
             '-y',
-            '-i', audio_file,
+            '-i', 'pipe:0' if audio_stream is not None else audio_file,
             '-loop', '1',
             '-i', logo_file,
             '-filter_complex',
             (
                 f"color=c=black:s={width}x{height}[bg];"
-                f"[0:a]aformat=channel_layouts=mono,showwaves=s={width}x{waveform_height}:mode=cline:colors=#{color}FF:draw=full[wave];"
+                f"[0:a]aformat=channel_layouts=mono,showwaves=s={width}x{waveform_height}:mode=cline:rate={fps}:colors=#{color}FF:draw=full[wave];"
                 f"[bg][wave]overlay=x=0:y=({height}-{waveform_height})/2[vid1];"
                 f"[1:v]scale=70:-1[logo];"
                 f"[vid1][logo]overlay=W-w-30:H-h-30[vid]"
+                + split_graph
             ),
-            '-map', '[vid]',
-            '-map', '0:a',
-            '-c:v', 'libx264',
-            '-pix_fmt', 'yuv420p',
-            '-r', '70',
-            '-c:a', 'aac',
-            '-shortest',
-            '-progress', 'pipe:1',
-            '-nostats',
-            output_file
+            *output_options,
         ]
 
-        duration = get_audio_duration(audio_file)
+        if audio_stream is not None:
+            # Streamed audio has no length up front; keep a copy only to size the progress bar
+            fd, tee_path = tempfile.mkstemp(suffix=".mp3", dir=os.path.dirname(os.path.abspath(output_file)))
+            os.close(fd)
+            duration = None
+        else:
+            duration = get_audio_duration(audio_file)
 
         logger.info("🎞️ Generating video, please wait...")
-        with subprocess.Popen(ffmpeg_cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True, bufsize=1) as process:
-            pbar = tqdm(total=duration, unit="s", desc="Progress", position=0)
-            time_pattern = re.compile(r"out_time_ms=(\d+)")
-
-            for line in process.stdout:
-                match = time_pattern.search(line)
-                if match:
-                    out_time = int(match.group(1)) / 1_000_000  # microseconds to seconds
-                    pbar.n = min(out_time, duration)
-                    pbar.refresh()
-
-            process.wait()
-            pbar.n = duration
-            pbar.refresh()
-            pbar.close()
-
-            if process.returncode != 0:
-                raise subprocess.CalledProcessError(process.returncode, ffmpeg_cmd)
+        run_ffmpeg(
+            ffmpeg_cmd,
+            duration=duration if audio_stream is None else (lambda: get_audio_duration(tee_path)),
+            input_stream=audio_stream,
+            tee_path=tee_path,
+            label="waveform"
+        )
 
         logger.info("✅ Video generation complete.")
         return output_file
 
-    except subprocess.CalledProcessError as e:
+    except FFmpegError as e:
         logger.error("❌ ffmpeg failed with return code %s", e.returncode)
         logger.error("🔍 Command: %s", ' '.join(ffmpeg_cmd))
+        logger.error("🔍 stderr tail:\n%s", e.stderr_tail)
         raise
     except Exception as e:
         logger.exception(f"❌ Unexpected error during video generation: {e}")
         raise
+    finally:
+        if tee_path and os.path.exists(tee_path):
+            os.remove(tee_path)
 
 
-def create_video(audio_file, logo_file, language, background):
-    resp, file = create_music_visualizer(audio_file,logo_file,background)
+def create_video(audio_file, logo_file, language, background, output_file="output.mp4", profile=None, outputs=None):
+    resp, file = create_music_visualizer(audio_file,logo_file,background,output_video=output_file,profile=profile,outputs=outputs)
     if resp:
         return file
     else:
-        return generate_fullwidth_waveform_video(audio_file,logo_file,language=language)
\ No newline at end of file
+        return generate_fullwidth_waveform_video(audio_file,logo_file,output_file=output_file,language=language,profile=profile,outputs=outputs)
@@ -0,0 +1,133 @@
+import subprocess
+import os
+import logging
+import numpy as np
+from ffmpeg_runner import run_ffmpeg
+from video import get_profile, output_args, static_plate
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("waveform")
+
+sample_rate = 44100
+
+
+def decode_audio(audio_file, rate=sample_rate):
+    """Decode an audio file once into a mono float32 array in [-1, 1]."""
+    result = subprocess.run(
+        ["ffmpeg", "-v", "error", "-i", audio_file, "-f", "f32le", "-ac", "1", "-ar", str(rate), "pipe:1"],
+        capture_output=True, check=True
+    )
+    return np.frombuffer(result.stdout, dtype=np.float32)
+
+
+def column_envelopes(samples, fps, width, rate=sample_rate):
+    """Per-frame, per-column minimum and maximum sample, shape (frames, width).
+
+    showwaves draws every sample of a frame into its column, so the union of
+    those strokes is exactly the span between the column's min and max.
+    """
+    per_frame = rate / fps
+    frames = max(int(np.ceil(len(samples) / per_frame)), 1)
+    per_column = max(int(round(per_frame / width)), 1)
+
+    starts = (np.arange(frames)[:, None] * per_frame + np.arange(width)[None, :] * (per_frame / width)).astype(np.int64)
+    index = starts[:, :, None] + np.arange(per_column)[None, None, :]
+    padded = np.concatenate([samples, np.zeros(per_column + int(per_frame) + 1, dtype=np.float32)])
+    window = padded[index]
+    return window.min(axis=2), window.max(axis=2)
+
+
+def span_rows(low, high, height, mode):
+    """Top and bottom pixel rows of each column for showwaves' line/cline modes."""
+    half = height / 2
+    if mode == "cline":
+        extent = np.maximum(np.abs(low), np.abs(high)) * half
+        top, bottom = half - extent, half + extent
+    else:
+        # "line": strokes run from the centre to each sample, so the span always covers the centre
+        top = half - np.maximum(high, 0) * half
+        bottom = half - np.minimum(low, 0) * half
+    return (
+        np.clip(np.floor(top), 0, height - 1).astype(np.int16),
+        np.clip(np.ceil(bottom), 0, height - 1).astype(np.int16),
+    )
+
+
+def waveform_frames(top, bottom, height, rgba):
+    """Yield raw RGBA bytes for each frame, rasterised into one reused buffer."""
+    width = top.shape[1]
+    rows = np.arange(height, dtype=np.int16)[:, None]
+    band = np.zeros((height, width, 4), dtype=np.uint8)
+    mask = np.empty((height, width), dtype=bool)
+    color = np.array(rgba, dtype=np.uint8)
+    for frame in range(top.shape[0]):
+        np.logical_and(rows >= top[frame], rows <= bottom[frame], out=mask)
+        band[:] = 0
+        band[mask] = color
+        yield band.tobytes()
+
+
+def render_waveform_video(audio_file, logo_file, output_file="output.mp4", language="English", background_image=None, profile=None, outputs=None):
+    """NumPy counterpart of create_music_visualizer / generate_fullwidth_waveform_video.
+
+    With a background it matches the visualizer (white ``line`` band at 60%
+    opacity over the cached static plate); without one it matches the black
+    full-width ``cline`` layout. Only the waveform band is piped to ffmpeg as
+    raw RGBA; ffmpeg overlays it and encodes.
+    """
+    width = 768
+    height = 1344
+    fps = get_profile(profile)["fps"]
+
+    if background_image:
+        band_height, band_y, mode = height // 8, height * 9 // 10, "line"
+        rgba = (255, 255, 255, 153)
+        plate = static_plate(
+            background_image, width, height, "This is an AI Generated Image and is NOT real", 24,
+            f"{os.path.splitext(output_file)[0]}-plate.png"
+        )
+        inputs = ["-loop", "1", "-framerate", str(fps), "-i", plate, "-i", logo_file]
+        graph = (
+            f"[2:v][0:v]overlay=0:{band_y}:shortest=1[vid1];"
+            f"[3:v]scale=60:60[logo];"
+            f"[vid1][logo]overlay={width-80}:{height-80}[vid]"
+        )
+    else:
+        band_height, band_y, mode = 300, (height - 300) // 2, "cline"
+        rgba = (0xFF, 0x64, 0x62, 255) if language == "Hindi" else (0x00, 0xFF, 0x00, 255)
+        inputs = ["-loop", "1", "-i", logo_file]
+        graph = (
+            f"color=c=black:s={width}x{height}:r={fps}[bg];"
+            f"[bg][0:v]overlay=x=0:y={band_y}:shortest=1[vid1];"
+            f"[2:v]scale=70:-1[logo];"
+            f"[vid1][logo]overlay=W-w-30:H-h-30[vid]"
+        )
+
+    outputs = outputs or [{"path": output_file}]
+    output_file = outputs[0]["path"]
+    split_graph, output_options = output_args(outputs, "vid", "1:a", width, height, profile)
+
+    samples = decode_audio(audio_file)
+    low, high = column_envelopes(samples, fps, width)
+    top, bottom = span_rows(low, high, band_height, mode)
+
+    ffmpeg_cmd = [
+        "ffmpeg", "-y",
+        "-f", "rawvideo", "-pix_fmt", "rgba", "-s", f"{width}x{band_height}", "-r", str(fps), "-i", "pipe:0",
+        "-i", audio_file,
+        *inputs,
+        "-filter_complex", graph + split_graph,
+        *output_options,
+    ]
+
+    logger.info(f"🎞️ Rendering {top.shape[0]} waveform frames with NumPy...")
+    run_ffmpeg(
+        ffmpeg_cmd,
+        duration=len(samples) / sample_rate,
+        input_stream=waveform_frames(top, bottom, band_height, rgba),
+        label="numpy-waveform"
+    )
+
+    logger.info(f"✅ Video generation complete: {output_file}")
+    return output_file